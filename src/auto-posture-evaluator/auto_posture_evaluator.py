@@ -6,10 +6,15 @@ from asyncio import AbstractEventLoop
 
 import importlib
 import sys
+from typing import Dict, Iterator, List
 from grpclib.client import Channel
+import kms_keys
+from delta_reports import DeltaReport, digest_name, get_default_region, get_digest_store
+from grpc_compression import GZIP_COMPRESSION_SUPPORTED, GZIP_COMPRESSION_THRESHOLD, post_compressed_security_report
 from model import SecurityReportTestResult, SecurityReportIngestionServiceStub, SecurityReportContext, SecurityReport, \
-    SecurityReportTestResultResult
+    SecurityReportTestResultResult, PostSecurityReportRequest
 from model.helper import struct_from_dict
+from model.wire import SecurityReportEncoder, post_encoded_security_report
 
 
 testers_module_names = []
@@ -22,52 +27,316 @@ for module in os.listdir(os.path.dirname(__file__) + '/testers'):
 del module
 
 
-def _adapter(log_message):
-    log_message["name"] = log_message.pop("test_name")
-    log_message["result"] = log_message.pop("test_result")
-    return log_message
+# Keys matching a SecurityReportTestResult attribute, and test_name/test_result which are sent as its
+# name/result, are never sent as additional data
+_reserved_keys = frozenset(dir(SecurityReportTestResult)) | {"test_name", "test_result"}
+_additional_data_keys_by_schema = {}
+
+
+def _additional_data_keys(log_message):
+    # A tester emits the same keys for all the results of a test, so the classification
+    # is done once per key set rather than once per key of every result
+    schema = tuple(log_message)
+    additional_data_keys = _additional_data_keys_by_schema.get(schema)
+    if additional_data_keys is None:
+        additional_data_keys = tuple(key for key in schema if key not in _reserved_keys)
+        _additional_data_keys_by_schema[schema] = additional_data_keys
+    return additional_data_keys
+
+
+def _to_models(log_messages, start_time, end_time) -> List["SecurityReportTestResult"]:
+    test_passed = SecurityReportTestResultResult.TEST_PASSED
+    test_failed = SecurityReportTestResultResult.TEST_FAILED
+    security_report_test_results = []
+    for log_message in log_messages:
+        additional_data = {}
+        for key in _additional_data_keys(log_message):
+            value = log_message[key]
+            if value:
+                additional_data[key] = value
+        security_report_test_results.append(SecurityReportTestResult(
+            name=log_message["test_name"],
+            start_time=start_time,
+            end_time=end_time,
+            item=log_message["item"],
+            item_type=log_message["item_type"],
+            result=test_passed if log_message["test_result"] == "no_issue_found" else test_failed,
+            additional_data=struct_from_dict(additional_data)
+        ))
+    return security_report_test_results
 
 
 def _to_model(log_message, start_time, end_time) -> "SecurityReportTestResult":
-    converted_log_message = _adapter(log_message)
-    additional_data = {}
-    test_result = SecurityReportTestResultResult.TEST_FAILED
-    if log_message["result"] == "no_issue_found":
-        test_result = SecurityReportTestResultResult.TEST_PASSED
-    for key in converted_log_message.keys():
-        if not hasattr(SecurityReportTestResult, key) and converted_log_message[key]:
-            additional_data[key] = converted_log_message[key]
-    return SecurityReportTestResult(
-        name=converted_log_message["name"],
-        start_time=start_time,
-        end_time=end_time,
-        item=converted_log_message["item"],
-        item_type=converted_log_message["item_type"],
-        result=test_result,
-        additional_data=struct_from_dict(additional_data)
-    )
+    return _to_models([log_message], start_time, end_time)[0]
+
+
+# Aggregated results: one result per (item, item_type), named RESOURCE_TESTS_NAME and failed when any of its
+# tests failed. The values shared by all the tests of the resource are sent once, the tests are listed under
+# RESOURCE_TESTS_KEY with their name, result, timestamp and the values of their own
+RESOURCE_TESTS_NAME = "resource_tests"
+RESOURCE_TESTS_KEY = "tests"
+_per_test_keys = ("test_name", "test_result", "timestamp")
+
+
+def _aggregate_by_resource(log_messages) -> List[Dict]:
+    log_messages_by_resource = {}
+    for log_message in log_messages:
+        log_messages_by_resource.setdefault((log_message["item"], log_message["item_type"]), []).append(log_message)
+    aggregated_results = []
+    for resource_log_messages in log_messages_by_resource.values():
+        shared = {key: resource_log_messages[0][key] for key in resource_log_messages[0] if key not in _per_test_keys}
+        for log_message in resource_log_messages[1:]:
+            for key in list(shared):
+                if key not in log_message or log_message[key] != shared[key]:
+                    del shared[key]
+        tests = []
+        for log_message in resource_log_messages:
+            tests.append({key: log_message[key] for key in log_message if key not in shared})
+        aggregated_result = shared
+        aggregated_result["timestamp"] = min(log_message["timestamp"] for log_message in resource_log_messages)
+        aggregated_result["test_name"] = RESOURCE_TESTS_NAME
+        aggregated_result["test_result"] = "no_issue_found" if all(
+            test["test_result"] == "no_issue_found" for test in tests) else "issue_found"
+        aggregated_result[RESOURCE_TESTS_KEY] = tests
+        aggregated_results.append(aggregated_result)
+    return aggregated_results
+
+
+def _aggregated_result_state(aggregated_result) -> str:
+    # The state of a resource for the delta reporting is the result of each of its tests, a change in any of
+    # them sends the resource again with all its tests
+    return ",".join(sorted(test["test_name"] + "=" + test["test_result"]
+                           for test in aggregated_result[RESOURCE_TESTS_KEY]))
+
+
+# The results of a tester taking more than one report are marked with the sequence number of their report,
+# from 1, and the ones of its last report as final
+REPORT_SEQUENCE_KEY = "report_sequence"
+REPORT_FINAL_KEY = "report_final"
+
+
+class _TesterReports:
+    # The reports of one tester run, all sent with the execution id of the run. A report is held back until
+    # the next one is added or the run is finished, so that the last report is known when it is sent. A run
+    # sent in a single report is not marked.
+    def __init__(self, evaluator, cur_tester, tester_module_name, execution_id, start_timestamp, delta_report):
+        self.evaluator = evaluator
+        self.cur_tester = cur_tester
+        self.tester_module_name = tester_module_name
+        self.execution_id = execution_id
+        self.start_timestamp = start_timestamp
+        self.delta_report = delta_report
+        self.pending = None
+        self.sequence = 1
+        self.sent = True
+
+    def add(self, results, end_timestamp):
+        # The results are aggregated before the delta filter, which then compares the resources as a whole
+        result_state = None
+        if self.evaluator.aggregate_by_resource:
+            results = _aggregate_by_resource(results)
+            result_state = _aggregated_result_state
+        if self.delta_report is not None:
+            results = self.delta_report.filter(results, result_state)
+            if not results:
+                print("DEBUG: No changed results to send for " + str(self.tester_module_name))
+                return
+        self._hold(results, end_timestamp)
+
+    def finish(self, complete: bool):
+        # The digest is saved only once every report of a complete run was sent, otherwise the next run is
+        # compared to the last successful one again
+        if complete and self.delta_report is not None:
+            disappeared_results = self.delta_report.disappeared()
+            if disappeared_results:
+                self._hold(disappeared_results, datetime.datetime.now())
+        if self.pending is not None:
+            self._send(*self.pending, final=True)
+            self.pending = None
+        if complete and self.delta_report is not None and self.sent:
+            self.delta_report.commit()
+
+    def _hold(self, results, end_timestamp):
+        if self.pending is not None:
+            self._send(*self.pending, final=False)
+        self.pending = (results, end_timestamp)
+
+    def _send(self, results, end_timestamp, final):
+        report_part = None
+        if self.sequence > 1 or not final:
+            report_part = {REPORT_SEQUENCE_KEY: self.sequence}
+            if final:
+                report_part[REPORT_FINAL_KEY] = True
+        self.sent = self.evaluator._send_report(self.cur_tester, self.tester_module_name, self.execution_id,
+                                                results, self.start_timestamp, end_timestamp,
+                                                report_part) and self.sent
+        self.sequence += 1
+
+
+_event_loop = None
+
+
+def _evaluator_event_loop() -> AbstractEventLoop:
+    # One loop per process, reused by the evaluators of the warm Lambda invocations
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop
 
 
 class AutoPostureEvaluator:
     def __init__(self):
         if not os.environ.get('API_KEY'):
             raise Exception("Missing the API_KEY environment variable. CANNOT CONTINUE")
+        # Records or replays the AWS responses when AUTOPOSTURE_BOTO_RECORD/AUTOPOSTURE_BOTO_REPLAY is set
+        self.boto_hooks = None
+        if os.environ.get('AUTOPOSTURE_BOTO_RECORD') or os.environ.get('AUTOPOSTURE_BOTO_REPLAY'):
+            import boto_replay
+            self.boto_hooks = boto_replay.install_from_environment()
 
         # Configuration for grpc endpoint
         endpoint = os.environ.get("CORALOGIX_ENDPOINT_HOST")  # eg.: ng-api-grpc.dev-shared.coralogix.net
         port = os.environ.get("CORALOGIX_ENDPOINT_PORT", "443")
-        self.channel = Channel(host=endpoint, port=int(port), ssl=True)
+        # Plaintext is only meant for local endpoints, e.g. benchmarks/ingestion_server.py
+        ssl = os.environ.get("CORALOGIX_ENDPOINT_SSL", "true").lower() != "false"
+        # The channel is bound to the current event loop when created. The evaluator sends on its own loop so
+        # that testers running their own (asyncio.run() clears the current loop when done) don't break the sends
+        self.loop = _evaluator_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.channel = Channel(host=endpoint, port=int(port), ssl=ssl)
         self.client = SecurityReportIngestionServiceStub(channel=self.channel)
         self.api_key = os.environ.get('API_KEY')
         self.tests = []
         self.application_name = os.environ.get('APPLICATION_NAME', 'NO_APP_NAME')
         self.subsystem_name = os.environ.get('SUBSYSTEM_NAME', 'NO_SUB_NAME')
+        # Encodes the reports straight to protobuf bytes instead of building the betterproto messages
+        self.report_encoder = None
+        if os.environ.get('AUTOPOSTURE_DIRECT_ENCODING', 'false').lower() == 'true':
+            self.report_encoder = SecurityReportEncoder()
+        # Gzips the reports larger than GZIP_COMPRESSION_THRESHOLD (grpc-encoding: gzip)
+        self.gzip_compression = os.environ.get('AUTOPOSTURE_GZIP_COMPRESSION', 'false').lower() == 'true'
+        if self.gzip_compression and not GZIP_COMPRESSION_SUPPORTED:
+            print("WARN: The gzip compression needs grpclib 0.4, sending the reports uncompressed")
+            self.gzip_compression = False
+        # Largest report sent for the testers streaming their results
+        self.report_chunk_size = int(os.environ.get('AUTOPOSTURE_REPORT_CHUNK_SIZE', 5000))
+        # Sends one result per resource with the results of all its tests instead of one result per test
+        self.aggregate_by_resource = os.environ.get('AUTOPOSTURE_AGGREGATE_BY_RESOURCE', 'false').lower() == 'true'
+        # Sends only the results which changed since the last successful run (see delta_reports)
+        self.delta_store = None
+        self.delta_region = None
+        if os.environ.get('AUTOPOSTURE_DELTA_REPORTING', 'false').lower() == 'true':
+            self.delta_store = get_digest_store()
+            self.delta_region = get_default_region()
         for tester_module in testers_module_names:
             if "Tester" in sys.modules[tester_module].__dict__:
                 self.tests.append(sys.modules[tester_module].__dict__["Tester"])
 
+    def _validate_results(self, results, error_template):
+        for result_obj in results:
+            if "timestamp" not in result_obj or "item" not in result_obj or "item_type" \
+                    not in result_obj or "test_result" not in result_obj:
+                print(error_template + " (FieldsMissing). CANNOT CONTINUE.")
+                continue
+            if result_obj["item"] is None:
+                print(error_template + " (ItemIsNone). CANNOT CONTINUE.")
+                continue
+            if not isinstance(result_obj["timestamp"], float):
+                print(error_template + " (ItemDateIsNotFloat). CANNOT CONTINUE.")
+                continue
+            if len(str(int(result_obj["timestamp"]))) != 10:
+                print(error_template + " (ItemDateIsNotTenDigitsIntPart). CANNOT CONTINUE.")
+                continue
+
+    def _send_report(self, cur_tester, tester_module_name, execution_id, results, start_timestamp,
+                     end_timestamp, report_part=None) -> bool:
+        context = SecurityReportContext(
+            provider=cur_tester.declare_tested_provider(),
+            service=cur_tester.declare_tested_service(),
+            execution_id=execution_id,
+            application_name=self.application_name,
+            computer_name="CoralogixServerlessLambda",
+            subsystem_name=self.subsystem_name
+        )
+        if report_part:
+            results = [dict(result, **report_part) for result in results]
+        if self.report_encoder is not None:
+            payload = self.report_encoder.encode(context, results, start_timestamp, end_timestamp)
+        else:
+            security_report_test_result_list = _to_models(results, start_timestamp, end_timestamp)
+            report = SecurityReport(context=context, test_results=security_report_test_result_list)
+            payload = bytes(PostSecurityReportRequest(security_report=report)) if self.gzip_compression else None
+        if self.gzip_compression and len(payload) >= GZIP_COMPRESSION_THRESHOLD:
+            request = post_compressed_security_report(self.channel, api_key=self.api_key, payload=payload)
+        elif payload is not None:
+            request = post_encoded_security_report(self.channel, api_key=self.api_key, payload=payload)
+        else:
+            request = self.client.post_security_report(api_key=self.api_key, security_report=report)
+        print("DEBUG: Sent " + str(len(results)) + " events for " + str(tester_module_name))
+        try:
+            self.loop.run_until_complete(request)
+        except Exception as ex:
+            print("ERROR: Failed to send " + str(len(results)) + " for tester " +
+                  str(tester_module_name) + " events due to the following exception: " + str(ex))
+            return False
+        return True
+
+    def _stream_results(self, tester_reports, tester_module_name, tester_result, error_template):
+        # Streaming contract: the tester yields results or batches (lists) of results, they are validated,
+        # converted and sent in reports of at most report_chunk_size results as they come
+        chunk = []
+        received_results = 0
+        complete = True
+        try:
+            for result_or_batch in tester_result:
+                if isinstance(result_or_batch, list):
+                    chunk.extend(result_or_batch)
+                else:
+                    chunk.append(result_or_batch)
+                while len(chunk) >= self.report_chunk_size:
+                    report_results = chunk[:self.report_chunk_size]
+                    del chunk[:self.report_chunk_size]
+                    self._validate_results(report_results, error_template)
+                    tester_reports.add(report_results, datetime.datetime.now())
+                    received_results += len(report_results)
+        except Exception as exTesterException:
+            print("WARN: The tester " + str(tester_module_name) +
+                  " has crashed with the following exception during 'run_tests()'. SKIPPED THE REST: " +
+                  str(exTesterException))
+            # The results are incomplete, the items missing from them didn't disappear
+            complete = False
+        if chunk:
+            self._validate_results(chunk, error_template)
+            tester_reports.add(chunk, datetime.datetime.now())
+            received_results += len(chunk)
+        if not received_results:
+            print(error_template + " (Empty array).")
+            return
+        tester_reports.finish(complete and self._is_run_complete(tester_reports.cur_tester, tester_module_name))
+
+    def _is_run_complete(self, cur_tester, tester_module_name) -> bool:
+        run_complete = getattr(cur_tester, "run_complete", None)
+        if run_complete is None or run_complete():
+            return True
+        print("DEBUG: The run of the tester " + str(tester_module_name) + " is partial, the items missing from "
+              "its results are not reported as disappeared")
+        return False
+
+    def _log_run_summary(self, cur_tester, tester_module_name):
+        run_summary = getattr(cur_tester, "run_summary", None)
+        if run_summary is None:
+            return
+        try:
+            summary = run_summary()
+        except Exception as ex:
+            print("WARN: Failed to summarize the run of the tester " + str(tester_module_name) + ": " + str(ex))
+            return
+        if summary:
+            print("DEBUG: " + str(tester_module_name) + ": " + summary)
+
     def run_tests(self):
         execution_id = str(uuid.uuid4())
+        kms_keys.clear_run_cache()
 
         for i in range(0, len(self.tests)):
             cur_test_start_timestamp = datetime.datetime.now()
@@ -87,47 +356,30 @@ class AutoPostureEvaluator:
             if tester_result is None:
                 print(error_template + " (ResultIsNone).")
                 continue
+            delta_report = None
+            if self.delta_store is not None:
+                delta_name = digest_name(testers_module_names[i], getattr(cur_tester, 'account_id', None),
+                                         self.delta_region)
+                # The digests of the aggregated results are kept apart, their entries are resources
+                if self.aggregate_by_resource:
+                    delta_name += '.' + RESOURCE_TESTS_NAME
+                delta_report = DeltaReport(self.delta_store, delta_name)
+            tester_reports = _TesterReports(self, cur_tester, testers_module_names[i], execution_id,
+                                           cur_test_start_timestamp, delta_report)
+            if isinstance(tester_result, Iterator):
+                self._stream_results(tester_reports, testers_module_names[i], tester_result, error_template)
+                self._log_run_summary(cur_tester, testers_module_names[i])
+                continue
             if not isinstance(tester_result, list):
                 print(error_template + " (NotArray).")
                 continue
             if not tester_result:
                 print(error_template + " (Empty array).")
                 continue
-            else:
-                for result_obj in tester_result:
-                    if "timestamp" not in result_obj or "item" not in result_obj or "item_type" \
-                            not in result_obj or "test_result" not in result_obj:
-                        print(error_template + " (FieldsMissing). CANNOT CONTINUE.")
-                        continue
-                    if result_obj["item"] is None:
-                        print(error_template + " (ItemIsNone). CANNOT CONTINUE.")
-                        continue
-                    if not isinstance(result_obj["timestamp"], float):
-                        print(error_template + " (ItemDateIsNotFloat). CANNOT CONTINUE.")
-                        continue
-                    if len(str(int(result_obj["timestamp"]))) != 10:
-                        print(error_template + " (ItemDateIsNotTenDigitsIntPart). CANNOT CONTINUE.")
-                        continue
-            security_report_test_result_list = list(map(lambda x: _to_model(x,
-                                                                            cur_test_start_timestamp,
-                                                                            cur_test_end_timestamp), tester_result))
-            context = SecurityReportContext(
-                provider=cur_tester.declare_tested_provider(),
-                service=cur_tester.declare_tested_service(),
-                execution_id=execution_id,
-                application_name=self.application_name,
-                computer_name="CoralogixServerlessLambda",
-                subsystem_name=self.subsystem_name
-            )
-            report = SecurityReport(context=context, test_results=security_report_test_result_list)
-            print("DEBUG: Sent " + str(len(security_report_test_result_list)) + " events for " +
-                  str(testers_module_names[i]))
-            loop: AbstractEventLoop = asyncio.get_event_loop()
-            try:
-                loop.run_until_complete(
-                    self.client.post_security_report(api_key=self.api_key, security_report=report))
-            except Exception as ex:
-                print("ERROR: Failed to send " + str(len(security_report_test_result_list)) + " for tester " +
-                      str(testers_module_names[i]) + " events due to the following exception: " + str(ex))
+            self._validate_results(tester_result, error_template)
+            tester_reports.add(tester_result, cur_test_end_timestamp)
+            tester_reports.finish(self._is_run_complete(cur_tester, testers_module_names[i]))
+            self._log_run_summary(cur_tester, testers_module_names[i])
         self.channel.close()
-
+        if self.boto_hooks is not None:
+            self.boto_hooks.close()
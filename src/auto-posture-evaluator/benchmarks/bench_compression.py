@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import datetime
+import gzip
+import os
+import socket
+import statistics
+import sys
+import time
+
+from grpclib.client import Channel
+from grpclib.server import Server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from grpc_compression import GZIP_COMPRESSION_LEVEL, post_compressed_security_report  # noqa: E402
+from ingestion_server import add_server_arguments, service_from_arguments  # noqa: E402
+from model import SecurityReportContext  # noqa: E402
+from model.wire import SecurityReportEncoder, post_encoded_security_report  # noqa: E402
+from synthetic_results import synthetic_results  # noqa: E402
+
+# Sends synthetic reports of a few sizes to the local stand-in ingestion server, uncompressed and gzipped, and
+# reports the bytes on the wire and the median send latency, e.g.:
+#   python benchmarks/bench_compression.py --sizes 10 1000 10000 --sends 20
+
+
+def _free_port() -> int:
+    with socket.socket() as free_port:
+        free_port.bind(('127.0.0.1', 0))
+        return free_port.getsockname()[1]
+
+
+async def _measure(service, channel, post, payload, sends):
+    wire_bytes = service.stats.wire_bytes
+    latencies = []
+    for _ in range(sends):
+        started_at = time.perf_counter()
+        await post(channel, api_key="benchmark", payload=payload)
+        latencies.append(time.perf_counter() - started_at)
+    return (service.stats.wire_bytes - wire_bytes) // sends, statistics.median(latencies)
+
+
+async def _run(args):
+    service = service_from_arguments(args)
+    port = _free_port()
+    server = Server([service])
+    await server.start('127.0.0.1', port)
+    channel = Channel('127.0.0.1', port)
+    context = SecurityReportContext(provider="aws", service="benchmark", execution_id="benchmark",
+                                    application_name="benchmark", computer_name="benchmark", subsystem_name="benchmark")
+    now = datetime.datetime.now()
+    try:
+        print("gzip level %d, median of %d sends" % (GZIP_COMPRESSION_LEVEL, args.sends))
+        for size in args.sizes:
+            payload = SecurityReportEncoder().encode(context, synthetic_results(size, args.test_names), now, now)
+            started_at = time.perf_counter()
+            gzip.compress(payload, compresslevel=GZIP_COMPRESSION_LEVEL)
+            compression_time = time.perf_counter() - started_at
+            plain_bytes, plain_latency = await _measure(service, channel, post_encoded_security_report, payload,
+                                                        args.sends)
+            gzip_bytes, gzip_latency = await _measure(service, channel, post_compressed_security_report, payload,
+                                                      args.sends)
+            print("%7d results: %9d -> %8d bytes, %7.1f ms -> %7.1f ms (compression %.1f ms)" % (
+                size, plain_bytes, gzip_bytes, plain_latency * 1000, gzip_latency * 1000, compression_time * 1000))
+    finally:
+        channel.close()
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the gzip compression of the reports')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help='Results per report')
+    parser.add_argument('--test-names', type=int, default=5, help='Distinct test names of the reports')
+    parser.add_argument('--sends', type=int, default=10, help='Sends of every report, the median is reported')
+    add_server_arguments(parser)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
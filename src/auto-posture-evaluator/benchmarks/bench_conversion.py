@@ -0,0 +1,99 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+
+from betterproto.lib.google.protobuf import ListValue, NullValue, Struct, Value
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('API_KEY', 'benchmark')
+from auto_posture_evaluator import _to_models  # noqa: E402
+from model import SecurityReportTestResult, SecurityReportTestResultResult  # noqa: E402
+from synthetic_results import synthetic_results  # noqa: E402
+
+# Micro-benchmark of the result dict -> SecurityReportTestResult conversion: the batch conversion (_to_models)
+# against the per-result conversion it replaced, kept below as the reference, e.g.:
+#   python benchmarks/bench_conversion.py --results 100000
+
+
+def _legacy_struct_from_dict(d):
+    # struct_from_dict before the batch conversion, building a null Value ahead of every value
+    def create_value(value):
+        new_value = Value(null_value=NullValue(0))
+        if isinstance(value, str):
+            new_value = Value(string_value=value)
+        elif isinstance(value, int) or isinstance(value, float):
+            new_value = Value(number_value=float(value))
+        elif isinstance(value, bool):
+            new_value = Value(bool_value=value)
+        elif isinstance(value, datetime.datetime):
+            new_value = Value(string_value=value.isoformat())
+        elif isinstance(value, dict) and len(value.keys()) != 0 and isinstance(list(set(value.keys()))[0], str):
+            new_value = Value(struct_value=_legacy_struct_from_dict(value))
+        elif isinstance(value, list):
+            new_value = Value(list_value=ListValue(values=list(map(lambda x: create_value(x), value))))
+        return new_value
+
+    return Struct(fields={key: create_value(d[key]) for key in d})
+
+
+def _legacy_to_model(log_message, start_time, end_time):
+    # The conversion before _to_models: the result is renamed in place and every key is checked with hasattr
+    log_message["name"] = log_message.pop("test_name")
+    log_message["result"] = log_message.pop("test_result")
+    additional_data = {}
+    test_result = SecurityReportTestResultResult.TEST_FAILED
+    if log_message["result"] == "no_issue_found":
+        test_result = SecurityReportTestResultResult.TEST_PASSED
+    for key in log_message.keys():
+        if not hasattr(SecurityReportTestResult, key) and log_message[key]:
+            additional_data[key] = log_message[key]
+    return SecurityReportTestResult(
+        name=log_message["name"],
+        start_time=start_time,
+        end_time=end_time,
+        item=log_message["item"],
+        item_type=log_message["item_type"],
+        result=test_result,
+        additional_data=_legacy_struct_from_dict(additional_data)
+    )
+
+
+def _best_rate(convert, template_results, repeat):
+    best = None
+    for _ in range(repeat):
+        # The legacy conversion renames the keys of the results in place, every run converts fresh copies
+        results = [dict(result) for result in template_results]
+        started_at = time.perf_counter()
+        models = convert(results)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return models, len(template_results) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the result to protobuf message conversion')
+    parser.add_argument('--results', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs')
+    args = parser.parse_args()
+
+    start_time = datetime.datetime.now()
+    end_time = datetime.datetime.now()
+    template_results = synthetic_results(args.results)
+    legacy_models, legacy_rate = _best_rate(
+        lambda results: [_legacy_to_model(result, start_time, end_time) for result in results], template_results,
+        args.repeat)
+    models, rate = _best_rate(lambda results: _to_models(results, start_time, end_time), template_results,
+                              args.repeat)
+
+    # Both conversions must produce the same messages
+    assert [bytes(model) for model in models] == [bytes(model) for model in legacy_models]
+    print("Per-result conversion: %.0f results/s" % legacy_rate)
+    print("Batch conversion:      %.0f results/s (x%.2f)" % (rate, rate / legacy_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('API_KEY', 'benchmark')
+from auto_posture_evaluator import _to_models  # noqa: E402
+from model import PostSecurityReportRequest, SecurityReport, SecurityReportContext  # noqa: E402
+from model.wire import ENCODER_FRAGMENT_CACHE_SIZE, SecurityReportEncoder  # noqa: E402
+from synthetic_results import synthetic_results  # noqa: E402
+
+# Benchmarks the encoding of a synthetic report (conversion + serialization): betterproto messages, the direct
+# encoder without its fragment cache and the direct encoder with it, e.g.:
+#   python benchmarks/bench_encoding.py --results 100000 --skip-betterproto
+
+
+def _betterproto_encode(context, results, start_time, end_time):
+    report = SecurityReport(context=context, test_results=_to_models(results, start_time, end_time))
+    return bytes(PostSecurityReportRequest(security_report=report))
+
+
+def _measure(name, encode, repeat, count):
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        payload = encode()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    encode()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%-28s %9.0f results/s, peak traced allocation %6.1f MB, %d bytes" % (
+        name, count / best, peak / 1024 / 1024, len(payload)))
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the encoding of a synthetic security report')
+    parser.add_argument('--results', type=int, default=100000)
+    parser.add_argument('--test-names', type=int, default=4, help='Distinct test names of the report')
+    parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs')
+    parser.add_argument('--skip-betterproto', action='store_true', help='betterproto takes minutes on 100k results')
+    args = parser.parse_args()
+
+    context = SecurityReportContext(provider="aws", service="benchmark", execution_id="benchmark",
+                                    application_name="benchmark", computer_name="benchmark", subsystem_name="benchmark")
+    results = synthetic_results(args.results, args.test_names)
+    start_time = datetime.datetime.now()
+    end_time = datetime.datetime.now()
+
+    payloads = []
+    if not args.skip_betterproto:
+        payloads.append(_measure("betterproto", lambda: _betterproto_encode(context, results, start_time, end_time),
+                                 1, args.results))
+    for name, cache_size in (("direct, no fragment cache", 0), ("direct, fragment cache", ENCODER_FRAGMENT_CACHE_SIZE)):
+        encoder = SecurityReportEncoder(fragment_cache_size=cache_size)
+        payloads.append(_measure(name, lambda: encoder.encode(context, results, start_time, end_time),
+                                 args.repeat, args.results))
+    assert all(payload == payloads[0] for payload in payloads)
+
+
+if __name__ == '__main__':
+    main()
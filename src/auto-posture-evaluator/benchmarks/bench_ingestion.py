@@ -0,0 +1,110 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from grpclib.server import Server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion_server import add_server_arguments, service_from_arguments  # noqa: E402
+
+# Drives AutoPostureEvaluator.run_tests through the local stand-in ingestion server with synthetic testers and
+# reports the throughput and send latency. The evaluator's options (AUTOPOSTURE_DIRECT_ENCODING,
+# AUTOPOSTURE_GZIP_COMPRESSION...) are taken from the environment as usual, e.g.:
+#   AUTOPOSTURE_DIRECT_ENCODING=true python benchmarks/bench_ingestion.py --reports 20 --results-per-report 5000
+
+
+def _synthetic_tester(index: int, results_per_report: int, stream: bool):
+    class Tester:
+        def declare_tested_service(self) -> str:
+            return 'benchmark' + str(index)
+
+        def declare_tested_provider(self) -> str:
+            return 'aws'
+
+        def _results(self):
+            timestamp = time.time()
+            for i in range(results_per_report):
+                yield {
+                    "user": "AIDABENCHMARK0000000",
+                    "account_arn": "arn:aws:iam::111111111111:user/benchmark",
+                    "account": "111111111111",
+                    "timestamp": timestamp,
+                    "item": "arn:aws:ec2:us-east-1:111111111111:volume/vol-%017d" % i,
+                    "item_type": "ebs_volume",
+                    "test_name": "benchmark_test_" + str(i % 5),
+                    "test_result": "issue_found" if i % 3 else "no_issue_found"
+                }
+
+        def run_tests(self):
+            return self._results() if stream else list(self._results())
+
+    return Tester
+
+
+def _percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percentile / 100.0 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the evaluator against the local stand-in server')
+    parser.add_argument('--port', type=int, default=50051)
+    parser.add_argument('--reports', type=int, default=20, help='Number of synthetic testers, one report each')
+    parser.add_argument('--results-per-report', type=int, default=5000)
+    parser.add_argument('--stream', action='store_true', help='Synthetic testers stream their results')
+    parser.add_argument('--verbose', action='store_true', help="Keep the evaluator's output")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    os.environ.setdefault('API_KEY', 'benchmark')
+    os.environ['CORALOGIX_ENDPOINT_HOST'] = '127.0.0.1'
+    os.environ['CORALOGIX_ENDPOINT_PORT'] = str(args.port)
+    os.environ['CORALOGIX_ENDPOINT_SSL'] = 'false'
+    import auto_posture_evaluator
+
+    send_latencies = []
+
+    class BenchmarkEvaluator(auto_posture_evaluator.AutoPostureEvaluator):
+        def _send_report(self, *send_args, **send_kwargs):
+            started_at = time.perf_counter()
+            try:
+                return super()._send_report(*send_args, **send_kwargs)
+            finally:
+                send_latencies.append(time.perf_counter() - started_at)
+
+    evaluator = BenchmarkEvaluator()
+    service = service_from_arguments(args)
+    server = Server([service])
+    # The server is served by the evaluator's loop while it sends
+    loop = evaluator.loop
+    loop.run_until_complete(server.start('127.0.0.1', args.port))
+    try:
+        evaluator.tests = [_synthetic_tester(i, args.results_per_report, args.stream) for i in range(args.reports)]
+        auto_posture_evaluator.testers_module_names[:] = ['benchmark' + str(i) for i in range(args.reports)]
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        started_at = time.perf_counter()
+        with output:
+            evaluator.run_tests()
+        elapsed = time.perf_counter() - started_at
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+
+    stats = service.stats
+    print("Sent %d reports, %d results in %.2fs" % (len(send_latencies), args.reports * args.results_per_report,
+                                                   elapsed))
+    print("Server received %d reports, %d results, %d bytes, rejected %d" % (stats.reports, stats.results,
+                                                                            stats.wire_bytes, stats.rejected))
+    print("Throughput: %.1f reports/s, %.0f results/s" % (stats.reports / elapsed, stats.results / elapsed))
+    if send_latencies:
+        print("Send latency (conversion included): p50 %.1f ms, p99 %.1f ms" % (
+            _percentile(send_latencies, 50) * 1000, _percentile(send_latencies, 99) * 1000))
+
+
+if __name__ == '__main__':
+    main()
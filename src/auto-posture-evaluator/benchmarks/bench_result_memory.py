@@ -0,0 +1,75 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_records import ResultBuilder  # noqa: E402
+
+# Peak RSS of a synthetic large scan held in memory, built as legacy result dicts or as ResultRecords. Each mode
+# runs in its own process so that the peaks don't mix, e.g.:
+#   python benchmarks/bench_result_memory.py --results 500000
+
+USER = "AIDABENCHMARK0000000"
+ACCOUNT_ARN = "arn:aws:iam::111111111111:user/benchmark"
+ACCOUNT = "111111111111"
+TEST_NAMES = ["volume_is_not_encrypted", "volume_attached_to_ec2", "volume_does_not_have_recent_snapshots",
+              "volume_not_encrypted_with_kms_customer_keys", "volume_snapshots_are_public"]
+
+
+def _dict_results(count):
+    # The strings are built per result like the testers' (the test names from str operations), not shared literals
+    return [{
+        "user": USER,
+        "account_arn": ACCOUNT_ARN,
+        "account": ACCOUNT,
+        "timestamp": time.time(),
+        "item": "vol-%017d" % (i // len(TEST_NAMES)),
+        "item_type": "ebs_" + "volume",
+        "test_name": "".join(TEST_NAMES[i % len(TEST_NAMES)]),
+        "test_result": "issue_found" if i % 3 else "no_issue_found"
+    } for i in range(count)]
+
+
+def _record_results(count):
+    records = ResultBuilder(USER, ACCOUNT_ARN, ACCOUNT)
+    return [records.result("vol-%017d" % (i // len(TEST_NAMES)), "ebs_" + "volume",
+                           "".join(TEST_NAMES[i % len(TEST_NAMES)]), issue_found=bool(i % 3))
+            for i in range(count)]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(mode, count):
+    baseline = _peak_rss_mb()
+    results = _dict_results(count) if mode == 'dicts' else _record_results(count)
+    print("%s %.1f %.1f %d" % (mode, baseline, _peak_rss_mb(), len(results)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak RSS of a synthetic scan, result dicts against ResultRecords')
+    parser.add_argument('--results', type=int, default=500000)
+    parser.add_argument('--mode', choices=['dicts', 'records'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        _measure(args.mode, args.results)
+        return
+
+    peaks = {}
+    for mode in ('dicts', 'records'):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--results', str(args.results),
+                                 '--mode', mode], check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        _, baseline, peak, _ = output.split()
+        peaks[mode] = float(peak)
+        print("%-8s peak RSS %7.1f MB (%.1f MB after the imports)" % (mode, float(peak), float(baseline)))
+    print("Reduction: %.0f%%" % (100 * (1 - peaks['records'] / peaks['dicts'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import cProfile
+import importlib
+import os
+import pstats
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto_replay  # noqa: E402
+
+# Runs a tester against a fixture recorded with AUTOPOSTURE_BOTO_RECORD (see boto_replay) and reports its AWS call
+# counts, wall and CPU time, optionally with a profile. The same fixture and options give the same call counts,
+# so a change in them between two commits is a regression (or an improvement) of the tester, e.g.:
+#   python benchmarks/bench_tester.py ebs_tester --fixture /tmp/ebs.json.gz --latency 0.02 --profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks a tester offline against recorded AWS responses')
+    parser.add_argument('tester', help='Tester module name, e.g. ebs_tester')
+    parser.add_argument('--fixture', required=True, help='Fixture recorded with AUTOPOSTURE_BOTO_RECORD')
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated seconds per AWS call')
+    parser.add_argument('--region', default=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+                        help='Region of the recorded scan')
+    parser.add_argument('--api-rate', type=float, default=1000000.0,
+                        help='AUTOPOSTURE_*_API_RATE for the run, the recorded calls need no throttling by default')
+    parser.add_argument('--profile', action='store_true', help='Print the top functions by cumulative time')
+    args = parser.parse_args()
+
+    # The replayed calls are never sent, no credentials are needed
+    os.environ.setdefault('AWS_DEFAULT_REGION', args.region)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'replay')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'replay')
+    # Read at import time by the testers' helpers, so set before the tester module is imported
+    os.environ['AUTOPOSTURE_EC2_API_RATE'] = str(args.api_rate)
+    os.environ['AUTOPOSTURE_RDS_API_RATE'] = str(args.api_rate)
+    replayer = boto_replay.install(boto_replay.BotoReplayer(args.fixture, args.latency))
+    tester_module = importlib.import_module('testers.' + args.tester)
+
+    profiler = cProfile.Profile() if args.profile else None
+    started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    tester = tester_module.Tester()
+    results = tester.run_tests()
+    results_count = sum(len(result) if isinstance(result, list) else 1 for result in results)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - started_at
+    cpu_elapsed = time.process_time() - cpu_started_at
+
+    print("%s: %d results in %.2fs (%.2fs CPU), %d AWS calls" % (
+        args.tester, results_count, elapsed, cpu_elapsed, sum(replayer.call_counts.values())))
+    for call, count in sorted(replayer.call_counts.items()):
+        print("  %-60s %d" % (call, count))
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for the GitHub REST API endpoints read by the GitHub tester (/user/orgs, /orgs/<org>/members,
+# /orgs/<org>/repos), for testing the client's pacing and pagination without a token. It paginates with Link
+# headers, answers If-None-Match with 304 Not Modified (not counted against the budget, like GitHub), counts down
+# X-RateLimit-Remaining over a window ending at X-RateLimit-Reset and can answer 403 with Retry-After (secondary
+# rate limit) every N requests.
+
+
+class GitHubStandIn:
+    def __init__(self, organizations=None, rate_limit: int = 5000, window_seconds: int = 3600,
+                 retry_after_every: int = 0, retry_after: int = 1):
+        # organizations: login -> {"members": [...], "2fa_disabled": [...], "admins": [...], "repos": [{...}]}
+        self.organizations = organizations or {}
+        self.rate_limit = rate_limit
+        self.remaining = rate_limit
+        self.reset = int(time.time()) + window_seconds
+        self.retry_after_every = retry_after_every
+        self.retry_after = retry_after
+        # (time, path, status) of every request received
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _items(self, path, query):
+        parts = path.strip('/').split('/')
+        if parts == ['user', 'orgs']:
+            return [{"login": login} for login in self.organizations]
+        if len(parts) != 3 or parts[0] != 'orgs' or parts[1] not in self.organizations:
+            return None
+        organization = self.organizations[parts[1]]
+        if parts[2] == 'repos':
+            return organization.get('repos', [])
+        if parts[2] != 'members':
+            return None
+        if query.get('filter') == ['2fa_disabled']:
+            return [{"login": login} for login in organization.get('2fa_disabled', [])]
+        if query.get('role') == ['admin']:
+            return [{"login": login} for login in organization.get('admins', [])]
+        return [{"login": login} for login in organization.get('members', [])]
+
+    def handle(self, path_and_query, headers):
+        # Returns (status, headers, body)
+        url = urlparse(path_and_query)
+        query = parse_qs(url.query)
+        with self._lock:
+            request_number = len(self.requests) + 1
+            if self.retry_after_every and request_number % self.retry_after_every == 0:
+                status = 403
+            elif self.remaining <= 0:
+                status = 403
+            else:
+                status = 200
+            items = self._items(url.path, query) if status == 200 else None
+            if status == 200 and items is None:
+                status = 404
+            response_headers = {}
+            body = None
+            if status == 200:
+                per_page = int(query.get('per_page', ['30'])[0])
+                page = int(query.get('page', ['1'])[0])
+                body = json.dumps(items[(page - 1) * per_page:page * per_page]).encode('utf-8')
+                etag = '"' + str(hash((url.path, url.query, body)) & 0xffffffff) + '"'
+                response_headers['ETag'] = etag
+                if page * per_page < len(items):
+                    next_query = dict(query, page=[str(page + 1)])
+                    response_headers['Link'] = '<http://' + headers['Host'] + url.path + '?' + '&'.join(
+                        key + '=' + values[0] for key, values in next_query.items()) + '>; rel="next"'
+                if headers.get('If-None-Match') == etag:
+                    status, body = 304, None
+                else:
+                    self.remaining -= 1
+            elif status == 403:
+                if self.remaining > 0:
+                    response_headers['Retry-After'] = str(self.retry_after)
+                body = json.dumps({"message": "API rate limit exceeded"}).encode('utf-8')
+            response_headers['X-RateLimit-Limit'] = str(self.rate_limit)
+            response_headers['X-RateLimit-Remaining'] = str(max(self.remaining, 0))
+            response_headers['X-RateLimit-Reset'] = str(self.reset)
+            self.requests.append((time.time(), path_and_query, status))
+        return status, response_headers, body
+
+
+def serve(stand_in: GitHubStandIn, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    # Serves the stand-in from a daemon thread, port 0 picks a free port (server.server_address)
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, headers, body = stand_in.handle(self.path, self.headers)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body or b'')))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the GitHub REST API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--organizations', type=int, default=3)
+    parser.add_argument('--members', type=int, default=250, help='Members per organization')
+    parser.add_argument('--rate-limit', type=int, default=5000)
+    parser.add_argument('--retry-after-every', type=int, default=0, help='Answer 403 Retry-After every N requests')
+    args = parser.parse_args()
+
+    organizations = {}
+    for i in range(args.organizations):
+        members = ['user%d-%d' % (i, j) for j in range(args.members)]
+        organizations['org' + str(i)] = {"members": members, "2fa_disabled": members[::10], "admins": members[:3],
+                                         "repos": [{"name": "repo%d-%d" % (i, j), "allow_forking": j % 2 == 0}
+                                                   for j in range(args.members // 5)]}
+    stand_in = GitHubStandIn(organizations, rate_limit=args.rate_limit, retry_after_every=args.retry_after_every)
+    server = serve(stand_in, args.host, args.port)
+    print("Listening on " + args.host + ":" + str(server.server_address[1]) +
+          " (set AUTOPOSTURE_GITHUB_API_URL=http://" + args.host + ":" + str(server.server_address[1]) + ")")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("Received " + str(len(stand_in.requests)) + " requests, " + str(stand_in.remaining) + " remaining")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import gzip
+import os
+import random
+import struct
+import sys
+
+import grpclib.const
+from grpclib.const import Status
+from grpclib.exceptions import GRPCError
+from grpclib.server import Server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import PostSecurityReportRequest, PostSecurityReportResponse  # noqa: E402
+from model.wire import POST_SECURITY_REPORT_ROUTE  # noqa: E402
+
+# Local stand-in for the Coralogix SecurityReportIngestionService, for end-to-end benchmarks without a real
+# endpoint. PostSecurityReport accepts the reports (gzipped or not) with a configurable latency, error rate and
+# message size limit.
+
+
+def _read_varint(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _length_delimited_fields(data):
+    # (field number, payload) of the length-delimited fields of a message, the other wire types are skipped
+    position = 0
+    while position < len(data):
+        key, position = _read_varint(data, position)
+        wire_type = key & 0x7
+        if wire_type == 2:
+            length, position = _read_varint(data, position)
+            yield key >> 3, data[position:position + length]
+            position += length
+        elif wire_type == 0:
+            _, position = _read_varint(data, position)
+        elif wire_type == 1:
+            position += 8
+        elif wire_type == 5:
+            position += 4
+        else:
+            raise ValueError("Unsupported wire type " + str(wire_type))
+
+
+def count_test_results(payload: bytes) -> int:
+    # Counts the test results of an encoded PostSecurityReportRequest without decoding them
+    count = 0
+    for field_number, security_report in _length_delimited_fields(memoryview(payload)):
+        if field_number == 1:
+            count += sum(1 for number, _ in _length_delimited_fields(security_report) if number == 2)
+    return count
+
+
+class IngestionServerStats:
+    def __init__(self):
+        self.reports = 0
+        self.results = 0
+        self.wire_bytes = 0
+        self.rejected = 0
+
+
+class StandInIngestionService:
+    def __init__(self, latency: float = 0.0, latency_jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: Status = Status.UNAVAILABLE, max_message_size: int = 4 * 1024 * 1024,
+                 decode: bool = False, seed: int = None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_message_size = max_message_size
+        self.decode = decode
+        self.stats = IngestionServerStats()
+        self._random = random.Random(seed)
+
+    async def _recv_payload(self, stream) -> bytes:
+        # grpclib's server can't receive compressed messages, the request message is read from the HTTP/2 stream
+        message_header = await stream._stream.recv_data(5)
+        compressed = struct.unpack('?', message_header[:1])[0]
+        message_length = struct.unpack('>I', message_header[1:])[0]
+        if message_length > self.max_message_size:
+            self.stats.rejected += 1
+            raise GRPCError(Status.RESOURCE_EXHAUSTED, 'Received message larger than max (' + str(message_length) +
+                            ' vs. ' + str(self.max_message_size) + ')')
+        message = await stream._stream.recv_data(message_length)
+        self.stats.wire_bytes += 5 + message_length
+        return gzip.decompress(message) if compressed else message
+
+    async def post_security_report(self, stream):
+        payload = await self._recv_payload(stream)
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.latency_jitter))
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats.rejected += 1
+            raise GRPCError(self.error_status, 'Injected error')
+        if self.decode:
+            security_report = PostSecurityReportRequest().parse(payload).security_report
+            self.stats.results += len(security_report.test_results)
+        else:
+            self.stats.results += count_test_results(payload)
+        self.stats.reports += 1
+        await stream.send_message(PostSecurityReportResponse())
+
+    def __mapping__(self):
+        return {
+            POST_SECURITY_REPORT_ROUTE: grpclib.const.Handler(
+                self.post_security_report,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                PostSecurityReportRequest,
+                PostSecurityReportResponse,
+            ),
+        }
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Random extra latency, up to this')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of the reports answered by an error')
+    parser.add_argument('--error-status', default='UNAVAILABLE', choices=[status.name for status in Status])
+    parser.add_argument('--max-message-size', type=int, default=4 * 1024 * 1024,
+                        help='Larger reports are rejected with RESOURCE_EXHAUSTED')
+    parser.add_argument('--decode', action='store_true', help='Fully decode the reports (slow)')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def service_from_arguments(args) -> StandInIngestionService:
+    return StandInIngestionService(latency=args.latency, latency_jitter=args.latency_jitter,
+                                   error_rate=args.error_rate, error_status=Status[args.error_status],
+                                   max_message_size=args.max_message_size, decode=args.decode, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the security report ingestion service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=50051)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    service = service_from_arguments(args)
+    server = Server([service])
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start(args.host, args.port))
+    print("Listening on " + args.host + ":" + str(args.port) +
+          " (set CORALOGIX_ENDPOINT_HOST/CORALOGIX_ENDPOINT_PORT and CORALOGIX_ENDPOINT_SSL=false)")
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        print("Received " + str(service.stats.reports) + " reports, " + str(service.stats.results) + " results, " +
+              str(service.stats.wire_bytes) + " bytes, rejected " + str(service.stats.rejected))
+
+
+if __name__ == '__main__':
+    main()
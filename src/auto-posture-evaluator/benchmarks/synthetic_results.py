@@ -0,0 +1,19 @@
+import time
+
+# Synthetic tester results shaped like the EBS/EC2 testers' ones, shared by the benchmarks
+
+ACCOUNT_ID = "111111111111"
+
+
+def synthetic_results(count: int, test_names: int = 5):
+    timestamp = time.time()
+    return [{
+        "user": "AIDABENCHMARK0000000",
+        "account_arn": "arn:aws:iam::" + ACCOUNT_ID + ":user/benchmark",
+        "account": ACCOUNT_ID,
+        "timestamp": timestamp,
+        "item": "arn:aws:ec2:us-east-1:" + ACCOUNT_ID + ":volume/vol-%017d" % i,
+        "item_type": "ebs_volume",
+        "test_name": "benchmark_test_" + str(i % test_names),
+        "test_result": "issue_found" if i % 3 else "no_issue_found"
+    } for i in range(count)]
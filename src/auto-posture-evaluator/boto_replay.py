@@ -0,0 +1,179 @@
+import atexit
+import base64
+import collections
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+# Record/replay of the boto3 calls, for reproducible offline benchmarks and profiling of the testers.
+# AUTOPOSTURE_BOTO_RECORD=<fixture.json.gz> records the responses of a real scan through botocore's event hooks,
+# AUTOPOSTURE_BOTO_REPLAY=<fixture.json.gz> answers the calls from the fixture instead of AWS, optionally with
+# AUTOPOSTURE_BOTO_REPLAY_LATENCY seconds of simulated latency per call. The hooks are installed on the default
+# boto3 session, so they apply to the clients created after install_from_environment().
+BOTO_RECORD = os.environ.get('AUTOPOSTURE_BOTO_RECORD')
+BOTO_REPLAY = os.environ.get('AUTOPOSTURE_BOTO_REPLAY')
+BOTO_REPLAY_LATENCY = float(os.environ.get('AUTOPOSTURE_BOTO_REPLAY_LATENCY', 0))
+
+_installed = None
+
+
+class ReplayMissError(Exception):
+    # The fixture has no (more) responses for a call, replay never falls back to AWS
+    pass
+
+
+def _encode(value):
+    # JSON has no datetime nor bytes, they are tagged
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if '__datetime__' in value:
+            return datetime.fromisoformat(value['__datetime__'])
+        if '__bytes__' in value:
+            return base64.b64decode(value['__bytes__'])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _read_streaming_bodies(parsed):
+    # Streaming bodies (s3 get_object...) are read to be recorded and replaced by a fresh stream for the caller.
+    # The recorded copy holds the content as bytes, which are turned back into a stream on replay.
+    recorded = {}
+    for key, value in parsed.items():
+        if isinstance(value, StreamingBody):
+            content = value.read()
+            parsed[key] = StreamingBody(io.BytesIO(content), len(content))
+            recorded[key] = {'__stream__': base64.b64encode(content).decode('ascii')}
+    return recorded
+
+
+def _call_key(model, context, params) -> str:
+    return json.dumps([model.service_model.service_name, context.get('client_region'), model.name, _encode(params)],
+                      sort_keys=True, default=str)
+
+
+class _BotoHooks:
+    def __init__(self, path: str):
+        self.path = path
+        self.call_counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def _remember_call_key(self, params, model, context, **kwargs):
+        context['boto_replay_key'] = _call_key(model, context, params)
+        with self._lock:
+            self.call_counts[model.service_model.service_name + '.' + model.name] += 1
+
+    def install(self, session):
+        session.events.register('provide-client-params.*.*', self._remember_call_key)
+
+    def close(self):
+        pass
+
+
+class BotoRecorder(_BotoHooks):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.responses = collections.defaultdict(list)
+        self._unsaved = False
+
+    def _record_response(self, http_response, parsed, model, context, **kwargs):
+        if 'boto_replay_key' not in context or http_response is None:
+            return
+        recorded = _encode(parsed)
+        recorded.update(_read_streaming_bodies(parsed))
+        with self._lock:
+            self.responses[context['boto_replay_key']].append({
+                'status_code': http_response.status_code,
+                'parsed': recorded
+            })
+            self._unsaved = True
+
+    def install(self, session):
+        super().install(session)
+        session.events.register('after-call.*.*', self._record_response)
+        atexit.register(self.close)
+
+    def close(self):
+        # Called by the evaluator at the end of a run and at exit, the fixture is only written when it has
+        # responses recorded since it was last written
+        with self._lock:
+            if not self._unsaved:
+                return
+            fixture = {'recorded_at': time.time(), 'responses': self.responses}
+            data = gzip.compress(json.dumps(fixture, default=str).encode('utf-8'))
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            temp_path = self.path + '.' + str(os.getpid()) + '.tmp'
+            with open(temp_path, 'wb') as fixture_file:
+                fixture_file.write(data)
+            os.replace(temp_path, self.path)
+            self._unsaved = False
+
+
+class BotoReplayer(_BotoHooks):
+    def __init__(self, path: str, latency: float = 0.0):
+        super().__init__(path)
+        self.latency = latency
+        with open(path, 'rb') as fixture_file:
+            fixture = json.loads(gzip.decompress(fixture_file.read()))
+        self.responses: Dict[str, collections.deque] = {
+            key: collections.deque(responses) for key, responses in fixture['responses'].items()}
+
+    def _replay_response(self, model, context, **kwargs):
+        key = context.get('boto_replay_key')
+        with self._lock:
+            responses = self.responses.get(key)
+            if not responses:
+                raise ReplayMissError('No recorded response for ' + str(key))
+            # The same call made more times than recorded gets the last response again
+            response = responses.popleft() if len(responses) > 1 else responses[0]
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = _decode({key: value for key, value in response['parsed'].items()
+                          if not (isinstance(value, dict) and '__stream__' in value)})
+        for key, value in response['parsed'].items():
+            if isinstance(value, dict) and '__stream__' in value:
+                content = base64.b64decode(value['__stream__'])
+                parsed[key] = StreamingBody(io.BytesIO(content), len(content))
+        return AWSResponse(None, response['status_code'], {}, None), parsed
+
+    def install(self, session):
+        super().install(session)
+        session.events.register('before-call.*.*', self._replay_response)
+
+
+def install(hooks: _BotoHooks, session=None) -> _BotoHooks:
+    hooks.install(session or boto3._get_default_session())
+    return hooks
+
+
+def install_from_environment() -> Optional[_BotoHooks]:
+    # Installs the recorder or the replayer configured by the environment, once per process
+    global _installed
+    if _installed is None:
+        if BOTO_REPLAY:
+            _installed = install(BotoReplayer(BOTO_REPLAY, BOTO_REPLAY_LATENCY))
+        elif BOTO_RECORD:
+            _installed = install(BotoRecorder(BOTO_RECORD))
+    return _installed
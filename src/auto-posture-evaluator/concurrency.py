@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List
+
+DEFAULT_MAX_WORKERS = int(os.environ.get('AUTOPOSTURE_MAX_WORKERS', 8))
+
+
+def bounded_map(func: Callable, items: Iterable, max_workers: int = DEFAULT_MAX_WORKERS) -> List:
+    # boto3 clients are thread safe, so testers can share a single client across the pool.
+    # Results keep the order of the given items.
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+class TokenBucket:
+    # Thread safe token bucket used to keep a pool of workers under an API's request rate
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
@@ -0,0 +1,182 @@
+import gzip
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Delta reporting: the digest of the last successful run of a tester in an account and region,
+# (test_name, item_type, item, occurrence) -> result state and identity, is kept in a store and only the new, changed
+# and disappeared results are sent, with a full report every DELTA_FULL_REFRESH_INTERVAL seconds.
+# AUTOPOSTURE_DELTA_STORE is a local directory (the default) or s3://bucket/prefix, with
+# AUTOPOSTURE_DELTA_STORE_ENDPOINT_URL for S3 compatible stores.
+DELTA_STORE = os.environ.get('AUTOPOSTURE_DELTA_STORE', '/tmp/auto_posture_evaluator_digests')
+DELTA_STORE_ENDPOINT_URL = os.environ.get('AUTOPOSTURE_DELTA_STORE_ENDPOINT_URL')
+DELTA_FULL_REFRESH_INTERVAL = int(os.environ.get('AUTOPOSTURE_DELTA_FULL_REFRESH_INTERVAL', 24 * 3600))
+
+DELTA_STATUS_KEY = "delta_status"
+DELTA_NEW = "new"
+DELTA_CHANGED = "changed"
+DELTA_DISAPPEARED = "disappeared"
+
+# The identity the results were tested as, kept in the digest for the results of the disappeared items
+_identity_keys = ("user", "account_arn", "account")
+
+
+class LocalDigestStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.json.gz')
+
+    def load(self, name) -> Optional[bytes]:
+        try:
+            with open(self._path(name), 'rb') as digest_file:
+                return digest_file.read()
+        except OSError:
+            return None
+
+    def save(self, name, data: bytes):
+        path = self._path(name)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = path + '.' + str(os.getpid()) + '.tmp'
+        with open(temp_path, 'wb') as digest_file:
+            digest_file.write(data)
+        os.replace(temp_path, path)
+
+
+class S3DigestStore:
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3_client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def _key(self, name):
+        return self.prefix + name + '.json.gz'
+
+    def load(self, name) -> Optional[bytes]:
+        try:
+            return self.s3_client.get_object(Bucket=self.bucket, Key=self._key(name))['Body'].read()
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+
+    def save(self, name, data: bytes):
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(name), Body=data)
+
+
+def get_digest_store(location: str = DELTA_STORE, endpoint_url: Optional[str] = DELTA_STORE_ENDPOINT_URL):
+    if location.startswith('s3://'):
+        bucket, _, prefix = location[len('s3://'):].partition('/')
+        if prefix and not prefix.endswith('/'):
+            prefix += '/'
+        return S3DigestStore(bucket, prefix, endpoint_url)
+    return LocalDigestStore(location)
+
+
+def get_default_region() -> Optional[str]:
+    return boto3.session.Session().region_name
+
+
+def digest_name(tester_module_name: str, account_id: Optional[str] = None, region: Optional[str] = None) -> str:
+    # The runs of a tester against other accounts or regions have digests of their own
+    return '.'.join(part for part in (tester_module_name, account_id, region) if part)
+
+
+class DeltaReport:
+    # Tracks the results of one tester run against the digest of its last successful run. filter() is given
+    # the results as they are sent and returns the ones to send, disappeared() the results of the items that
+    # are gone, and commit() saves the digest of this run once everything was sent successfully.
+    # A test reporting the same item more than once has each of its results tracked by their occurrence.
+    def __init__(self, store, name: str, full_refresh_interval: int = DELTA_FULL_REFRESH_INTERVAL):
+        self.store = store
+        self.name = name
+        self.previous_identities: List[List] = []
+        self.previous_results: Dict[Tuple, Tuple[int, int]] = {}
+        self.identities: Dict[Tuple, int] = {}
+        self.current_results: Dict[Tuple, Tuple[int, int]] = {}
+        self.occurrences: Dict[Tuple, int] = {}
+        self.full_report_at = time.time()
+        self.full_report = True
+        try:
+            data = store.load(name)
+            if data is not None:
+                digest = json.loads(gzip.decompress(data))
+                self.previous_identities = digest["identities"]
+                self.previous_results = {(test_name, item_type, item, occurrence): (state, identity)
+                                         for test_name, item_type, item, occurrence, state, identity
+                                         in digest["results"]}
+                if time.time() - digest["full_report_at"] < full_refresh_interval:
+                    self.full_report_at = digest["full_report_at"]
+                    self.full_report = False
+        except (OSError, ValueError, KeyError, TypeError, BotoCoreError, ClientError) as ex:
+            print("WARN: Failed to load the results digest of " + name + ", sending a full report: " + str(ex))
+
+    def filter(self, results, result_state: Optional[Callable] = None) -> List:
+        # A result is changed when its state changed, by default whether it failed. result_state gives the
+        # state of results combining several tests, a (JSON serializable) value compared to the previous one
+        to_send = []
+        for result in results:
+            result_key = (result["test_name"], result["item_type"], result["item"])
+            occurrence = self.occurrences.get(result_key, 0)
+            self.occurrences[result_key] = occurrence + 1
+            key = result_key + (occurrence,)
+            if result_state is None:
+                state = 0 if result["test_result"] == "no_issue_found" else 1
+            else:
+                state = result_state(result)
+            identity = tuple(result.get(identity_key) for identity_key in _identity_keys)
+            self.current_results[key] = (state, self.identities.setdefault(identity, len(self.identities)))
+            previous_result = self.previous_results.get(key)
+            if self.full_report:
+                to_send.append(result)
+            elif previous_result is None:
+                to_send.append(_with_delta_status(result, DELTA_NEW))
+            elif previous_result[0] != state:
+                to_send.append(_with_delta_status(result, DELTA_CHANGED))
+        return to_send
+
+    def disappeared(self) -> List[Dict]:
+        # An item that is gone no longer has the issue, it is reported as passed
+        timestamp = time.time()
+        disappeared_results = []
+        for key, (_, identity) in self.previous_results.items():
+            if key in self.current_results:
+                continue
+            test_name, item_type, item, _ = key
+            result = dict(zip(_identity_keys, self.previous_identities[identity]))
+            result.update({
+                "timestamp": timestamp,
+                "item": item,
+                "item_type": item_type,
+                "test_name": test_name,
+                "test_result": "no_issue_found",
+                DELTA_STATUS_KEY: DELTA_DISAPPEARED
+            })
+            disappeared_results.append(result)
+        return disappeared_results
+
+    def commit(self):
+        digest = {
+            "full_report_at": self.full_report_at,
+            "identities": [list(identity) for identity in self.identities],
+            "results": [[test_name, item_type, item, occurrence, state, identity]
+                        for (test_name, item_type, item, occurrence), (state, identity)
+                        in self.current_results.items()]
+        }
+        try:
+            self.store.save(self.name, gzip.compress(json.dumps(digest, separators=(',', ':')).encode('utf-8')))
+        except (OSError, TypeError, ValueError, BotoCoreError, ClientError) as ex:
+            print("WARN: Failed to save the results digest of " + self.name + ", the next run is compared to "
+                  "the previous one: " + str(ex))
+
+
+def _with_delta_status(result, delta_status):
+    if isinstance(result, dict):
+        result = dict(result)
+    else:
+        result = result.to_dict()
+    result[DELTA_STATUS_KEY] = delta_status
+    return result
@@ -0,0 +1,34 @@
+import json
+import os
+import time
+
+CACHE_DIRECTORY = os.environ.get('AUTOPOSTURE_CACHE_DIRECTORY', '/tmp/auto_posture_evaluator_cache')
+
+
+def _cache_path(name):
+    return os.path.join(CACHE_DIRECTORY, name + '.json')
+
+
+def load(name, ttl_seconds):
+    # Returns None when the entry is missing, expired or unreadable
+    path = _cache_path(name)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl_seconds:
+            return None
+        with open(path, 'r') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def store(name, value):
+    # The cache is an optimization only, failing to write it must never fail a tester
+    path = _cache_path(name)
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        temp_path = path + '.' + str(os.getpid()) + '.tmp'
+        with open(temp_path, 'w') as cache_file:
+            json.dump(value, cache_file)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError):
+        pass
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import disk_cache
+
+GITHUB_API_URL = os.environ.get('AUTOPOSTURE_GITHUB_API_URL', 'https://api.github.com')
+GITHUB_MAX_CONCURRENCY = int(os.environ.get('AUTOPOSTURE_GITHUB_MAX_CONCURRENCY', 8))
+GITHUB_ETAG_CACHE_TTL = int(os.environ.get('AUTOPOSTURE_GITHUB_ETAG_CACHE_TTL', 7 * 24 * 3600))
+GITHUB_PAGE_SIZE = 100
+# Requests kept in reserve for other consumers of the token, the run stops before eating into them
+GITHUB_RATE_LIMIT_RESERVE = int(os.environ.get('AUTOPOSTURE_GITHUB_RATE_LIMIT_RESERVE', 100))
+# Below this many remaining requests, requests are spread over the time left until the window resets
+GITHUB_PACING_THRESHOLD = int(os.environ.get('AUTOPOSTURE_GITHUB_PACING_THRESHOLD', 1000))
+# Upper bound of the delay added between requests once pacing kicks in
+GITHUB_MAX_PACING_DELAY = float(os.environ.get('AUTOPOSTURE_GITHUB_MAX_PACING_DELAY', 2))
+# Longest Retry-After (secondary rate limit) the client waits for before giving up on the run
+GITHUB_MAX_RETRY_AFTER = int(os.environ.get('AUTOPOSTURE_GITHUB_MAX_RETRY_AFTER', 60))
+
+
+class GitHubRateLimitExhausted(Exception):
+    pass
+
+
+class GitHubClient:
+    # Asyncio front for a pooled requests session. The blocking calls run on a dedicated thread pool
+    # sized like the connection pool, so every concurrent request reuses a kept-alive connection.
+    # Responses are cached on disk with their ETag: a conditional request answered by 304 Not Modified
+    # doesn't count against the rate limit. Requests are paced from the X-RateLimit-* headers and
+    # GitHubRateLimitExhausted is raised once the budget (minus a reserve) is used up.
+    def __init__(self, token, max_concurrency=GITHUB_MAX_CONCURRENCY, cache_name='github_etags'):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": "token " + token,
+            "Accept": "application/vnd.github.v3+json"
+        })
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.cache_name = cache_name
+        self.etag_cache = disk_cache.load(cache_name, GITHUB_ETAG_CACHE_TTL) or {}
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self.exhausted = False
+        self._rate_limit_lock = threading.Lock()
+        self._next_request_at = 0.0
+
+    def _wait_for_budget(self):
+        # Spreads the remaining budget over the time left until the rate limit window resets
+        with self._rate_limit_lock:
+            if self.exhausted:
+                raise GitHubRateLimitExhausted()
+            now = time.time()
+            interval = 0.0
+            if self.rate_limit_remaining is not None and self.rate_limit_reset > now:
+                budget = self.rate_limit_remaining - GITHUB_RATE_LIMIT_RESERVE
+                if budget <= 0:
+                    self.exhausted = True
+                    raise GitHubRateLimitExhausted()
+                if budget < GITHUB_PACING_THRESHOLD:
+                    interval = min((self.rate_limit_reset - now) / budget, GITHUB_MAX_PACING_DELAY)
+                # Counted before the response arrives so concurrent requests see it
+                self.rate_limit_remaining -= 1
+            wait_seconds = max(self._next_request_at - now, 0.0)
+            self._next_request_at = now + wait_seconds + interval
+        if wait_seconds:
+            time.sleep(wait_seconds)
+
+    def _update_rate_limit(self, headers):
+        if 'X-RateLimit-Remaining' not in headers or 'X-RateLimit-Reset' not in headers:
+            return
+        remaining = int(headers['X-RateLimit-Remaining'])
+        reset = int(headers['X-RateLimit-Reset'])
+        with self._rate_limit_lock:
+            # Responses of concurrent requests arrive out of order, within a window the lowest count is the latest
+            if self.rate_limit_reset is None or reset > self.rate_limit_reset:
+                self.rate_limit_remaining, self.rate_limit_reset = remaining, reset
+            elif reset == self.rate_limit_reset:
+                self.rate_limit_remaining = min(self.rate_limit_remaining, remaining)
+
+    def _request(self, url, headers):
+        for attempt in range(2):
+            self._wait_for_budget()
+            response = self.session.get(url, headers=headers)
+            self._update_rate_limit(response.headers)
+            if response.status_code not in (403, 429) or \
+                    ('Retry-After' not in response.headers and response.headers.get('X-RateLimit-Remaining') != '0'):
+                return response
+            if 'Retry-After' in response.headers:
+                retry_after = int(response.headers['Retry-After'])
+            else:
+                retry_after = int(response.headers['X-RateLimit-Reset']) - int(time.time())
+            if attempt or retry_after > GITHUB_MAX_RETRY_AFTER:
+                break
+            time.sleep(max(retry_after, 0))
+        with self._rate_limit_lock:
+            self.exhausted = True
+        raise GitHubRateLimitExhausted()
+
+    def _get(self, url, fields):
+        cache_key = url + '#' + ','.join(fields or ())
+        cached = self.etag_cache.get(cache_key)
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+        response = self._request(url, headers)
+        if response.status_code == 304 and cached:
+            return cached['body'], cached['next']
+        response.raise_for_status()
+        body = response.json()
+        if fields is not None:
+            # Only the fields the testers read are kept, this keeps the on-disk cache small
+            body = [{field: item.get(field) for field in fields} for item in body]
+        next_url = response.links.get('next', {}).get('url')
+        if response.headers.get('ETag'):
+            self.etag_cache[cache_key] = {'etag': response.headers['ETag'], 'body': body, 'next': next_url}
+        return body, next_url
+
+    async def get(self, path_or_url, fields: Optional[Sequence[str]] = None):
+        url = path_or_url if path_or_url.startswith('http') else GITHUB_API_URL + path_or_url
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._get, url, fields)
+
+    async def get_all(self, path, fields: Optional[Sequence[str]] = None) -> List:
+        # Follows the Link: <...>; rel="next" headers until the last page
+        separator = '&' if '?' in path else '?'
+        url = path + separator + 'per_page=' + str(GITHUB_PAGE_SIZE)
+        items = []
+        while url:
+            body, url = await self.get(url, fields)
+            items.extend(body)
+        return items
+
+    def close(self):
+        disk_cache.store(self.cache_name, self.etag_cache)
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    async def __aenter__(self) -> "GitHubClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,101 @@
+import gzip
+import os
+import struct
+import time
+
+import grpclib
+from grpclib.client import Channel, Stream
+from grpclib.const import Cardinality
+from grpclib.encoding.base import GRPC_CONTENT_TYPE
+from grpclib.exceptions import ProtocolError
+from grpclib.metadata import USER_AGENT, encode_metadata, encode_timeout
+from multidict import MultiDict
+
+from model import PostSecurityReportResponse
+from model.wire import POST_SECURITY_REPORT_ROUTE, EncodedPostSecurityReportRequest
+
+# Reports smaller than this are sent uncompressed, compressing them costs more than it saves
+GZIP_COMPRESSION_THRESHOLD = int(os.environ.get('AUTOPOSTURE_GZIP_COMPRESSION_THRESHOLD', 16 * 1024))
+GZIP_COMPRESSION_LEVEL = int(os.environ.get('AUTOPOSTURE_GZIP_COMPRESSION_LEVEL', 6))
+
+# GzipStream follows the internals of grpclib 0.4's client stream (pinned in requirements.txt), with another
+# version the reports are sent uncompressed
+GZIP_COMPRESSION_SUPPORTED = grpclib.__version__.startswith('0.4.') and \
+    all(hasattr(Stream, method) for method in ('send_request', 'send_message', 'recv_message')) and \
+    hasattr(Channel, '__connect__')
+
+
+class GzipStream(Stream):
+    # grpclib doesn't implement message compression: this client stream sends the grpc-encoding: gzip request
+    # header and its messages gzipped with the compressed flag set. The two methods follow grpclib 0.4's
+    # Stream.send_request/send_message, only the headers and the message framing differ.
+    compression_level = GZIP_COMPRESSION_LEVEL
+
+    async def send_request(self, *, end: bool = False) -> None:
+        if self._send_request_done:
+            raise ProtocolError('Request is already sent')
+
+        with self._wrapper:
+            protocol = await self._channel.__connect__()
+            stream = protocol.processor.connection.create_stream(wrapper=self._wrapper)
+            headers = [
+                (':method', 'POST'),
+                (':scheme', self._channel._scheme),
+                (':path', self._method_name),
+                (':authority', self._channel._authority),
+            ]
+            if self._deadline is not None:
+                headers.append(('grpc-timeout', encode_timeout(self._deadline.time_remaining())))
+            headers.extend((
+                ('te', 'trailers'),
+                ('content-type', GRPC_CONTENT_TYPE),
+                ('user-agent', USER_AGENT),
+                ('grpc-encoding', 'gzip'),
+                ('grpc-accept-encoding', 'identity'),
+            ))
+            metadata, = await self._dispatch.send_request(
+                self._metadata,
+                method_name=self._method_name,
+                deadline=self._deadline,
+                content_type=GRPC_CONTENT_TYPE,
+            )
+            headers.extend(encode_metadata(metadata))
+            release_stream = await stream.send_request(headers, end_stream=end, _processor=protocol.processor)
+            self._stream = stream
+            self._release_stream = release_stream
+            self.peer = self._stream.connection.get_peer()
+            self._send_request_done = True
+            if end:
+                self._end_done = True
+
+    async def send_message(self, message, *, end: bool = False) -> None:
+        if not self._send_request_done:
+            await self.send_request()
+        if self._send_message_done and not self._cardinality.client_streaming:
+            raise ProtocolError('Message was already sent')
+        if self._end_done:
+            raise ProtocolError('Stream is ended')
+
+        with self._wrapper:
+            message, = await self._dispatch.send_message(message)
+            message_bin = gzip.compress(self._codec.encode(message, self._send_type),
+                                        compresslevel=self.compression_level)
+            await self._stream.send_data(struct.pack('?', True) + struct.pack('>I', len(message_bin)) + message_bin,
+                                         end_stream=end or not self._cardinality.client_streaming)
+            self._send_message_done = True
+            self._messages_sent += 1
+            self._stream.connection.messages_sent += 1
+            self._stream.connection.last_message_sent = time.monotonic()
+            if end:
+                self._end_done = True
+
+
+async def post_compressed_security_report(channel: Channel, api_key: str, payload: bytes) -> PostSecurityReportResponse:
+    # Sends an encoded PostSecurityReportRequest (see model.wire) gzipped
+    stream = GzipStream(channel, POST_SECURITY_REPORT_ROUTE, MultiDict([('authorization', api_key)]),
+                        Cardinality.UNARY_UNARY, EncodedPostSecurityReportRequest, PostSecurityReportResponse,
+                        codec=channel._codec, status_details_codec=channel._status_details_codec,
+                        dispatch=channel.__dispatch__)
+    async with stream:
+        await stream.send_message(EncodedPostSecurityReportRequest(payload), end=True)
+        return await stream.recv_message()
@@ -1,3 +1,6 @@
+from typing import Iterator, Optional, Union
+
+
 class TesterInterface:
     def declare_tested_service(self) -> str:
         pass
@@ -5,5 +8,16 @@ class TesterInterface:
     def declare_tested_provider(self) -> str:
         pass
 
-    def run_tests(self) -> list:
+    def run_tests(self) -> Union[list, Iterator]:
+        # Either the list of the results, or an iterator (generator) yielding results or lists of results
+        # which the evaluator sends in bounded chunks as they come
         pass
+
+    def run_summary(self) -> Optional[str]:
+        # Optional one line summary of the last run_tests (timings, counts...), logged by the evaluator
+        return None
+
+    def run_complete(self) -> bool:
+        # Whether the last run_tests covered all of its items. After a partial run (scans deferred by a rate
+        # limit...) the items missing from the results are not taken for gone by the delta reporting
+        return True
@@ -0,0 +1,94 @@
+from typing import Dict, List
+
+from concurrency import bounded_map
+
+# Testers of the same run share the key snapshot and alias map instead of listing every key again. Both are kept
+# per (account, region) and only for the current evaluator run, see clear_run_cache()
+_key_snapshots = {}
+_key_aliases = {}
+
+
+def clear_run_cache():
+    # Called by the evaluator at the start of every run, a warm Lambda must not report the key state of a
+    # previous invocation
+    _key_snapshots.clear()
+    _key_aliases.clear()
+
+
+def _list_key_ids(kms_client):
+    key_ids = []
+    paginator = kms_client.get_paginator('list_keys')
+    for page in paginator.paginate(PaginationConfig={'PageSize': 1000}):
+        key_ids.extend(key['KeyId'] for key in page['Keys'])
+    return key_ids
+
+
+def _describe_key(kms_client, key_id):
+    try:
+        return kms_client.describe_key(KeyId=key_id)['KeyMetadata']
+    except kms_client.exceptions.NotFoundException:
+        # The key was deleted between the listing and the describe call
+        return None
+
+
+def _get_key_rotation_status(kms_client, key_id):
+    try:
+        return kms_client.get_key_rotation_status(KeyId=key_id)['KeyRotationEnabled']
+    except (kms_client.exceptions.UnsupportedOperationException, kms_client.exceptions.KMSInvalidStateException,
+            kms_client.exceptions.NotFoundException):
+        # Asymmetric, HMAC, imported and custom key store keys don't support rotation,
+        # and keys pending deletion or import can't report it
+        return None
+
+
+def is_customer_managed(key_metadata) -> bool:
+    return key_metadata['KeyManager'] == 'CUSTOMER'
+
+
+def get_kms_key_snapshot(kms_client, account_id) -> Dict[str, Dict]:
+    # Returns key id -> {"metadata": <describe_key KeyMetadata>, "rotation_enabled": bool or None}.
+    # The rotation status is only fetched for customer managed keys, AWS managed keys rotate on their own.
+    cache_key = (account_id, kms_client.meta.region_name)
+    cached = _key_snapshots.get(cache_key)
+    if cached is not None:
+        return cached
+
+    key_ids = _list_key_ids(kms_client)
+    key_metadata = bounded_map(lambda key_id: _describe_key(kms_client, key_id), key_ids)
+    snapshot = {}
+    for key_id, metadata in zip(key_ids, key_metadata):
+        if metadata is not None:
+            snapshot[key_id] = {"metadata": metadata, "rotation_enabled": None}
+
+    customer_managed_key_ids = [key_id for key_id, key in snapshot.items() if is_customer_managed(key["metadata"])]
+    rotation_statuses = bounded_map(lambda key_id: _get_key_rotation_status(kms_client, key_id),
+                                    customer_managed_key_ids)
+    for key_id, rotation_enabled in zip(customer_managed_key_ids, rotation_statuses):
+        snapshot[key_id]["rotation_enabled"] = rotation_enabled
+
+    _key_snapshots[cache_key] = snapshot
+    return snapshot
+
+
+def get_kms_key_aliases(kms_client, account_id) -> Dict[str, List[str]]:
+    # Returns key -> alias names, indexed both by key ARN and by bare key id since
+    # services reference keys either way (e.g. EBS volumes report the key ARN)
+    cache_key = (account_id, kms_client.meta.region_name)
+    cached = _key_aliases.get(cache_key)
+    if cached is not None:
+        return cached
+
+    aliases_by_key = {}
+    paginator = kms_client.get_paginator('list_aliases')
+    for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+        for alias in page['Aliases']:
+            if not alias.get('TargetKeyId'):
+                continue
+            # arn:aws:kms:<region>:<account>:alias/<name> -> arn:aws:kms:<region>:<account>:key/<key id>
+            key_arn = alias['AliasArn'].split(':alias/')[0] + ':key/' + alias['TargetKeyId']
+            aliases = aliases_by_key.setdefault(key_arn, [])
+            aliases.append(alias['AliasName'])
+            aliases_by_key[alias['TargetKeyId']] = aliases
+
+    _key_aliases[cache_key] = aliases_by_key
+    return aliases_by_key
@@ -7,22 +7,22 @@ from betterproto.lib.google.protobuf import Struct, Value, NullValue, ListValue
 def struct_from_dict(d: Dict[str, Any]) -> "Struct":
 
     def create_value(value) -> "Value":
-        new_value: "Value" = Value(null_value=NullValue(0))
         if isinstance(value, str):
-            new_value = Value(string_value=value)
+            return Value(string_value=value)
         elif isinstance(value, int) or isinstance(value, float):
-            new_value = Value(number_value=float(value))
+            return Value(number_value=float(value))
         elif isinstance(value, bool):
-            new_value = Value(bool_value=value)
+            return Value(bool_value=value)
         elif isinstance(value, datetime):
-            new_value = Value(string_value=value.isoformat())
-        elif isinstance(value, dict) and len(value.keys()) != 0 and isinstance(list(set(value.keys()))[0], str):
+            return Value(string_value=value.isoformat())
+        elif isinstance(value, dict) and len(value) != 0 and isinstance(next(iter(value)), str):
             struct = struct_from_dict(value)
-            new_value = Value(struct_value=struct)
+            return Value(struct_value=struct)
         elif isinstance(value, list):
-            list_value = list(map(lambda x: create_value(x), value))
-            new_value = Value(list_value=ListValue(values=list_value))
-        return new_value
+            list_value = [create_value(x) for x in value]
+            return Value(list_value=ListValue(values=list_value))
+        # The null value is only built for the unsupported types instead of ahead of every value
+        return Value(null_value=NullValue(0))
 
     ret = {}
     for key in d:
@@ -0,0 +1,219 @@
+import os
+import struct
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import betterproto
+from grpclib.client import Channel
+from grpclib.const import Cardinality
+
+from model import PostSecurityReportResponse, SecurityReportContext, SecurityReportTestResult
+
+# Direct protobuf encoder for PostSecurityReportRequest. The bytes are written straight from the testers' result
+# dicts, skipping the betterproto message objects, and are the same bytes betterproto produces for the messages
+# built by _to_models / struct_from_dict (field order, omitted defaults and the oneof/optional empty fields included).
+
+# Encoded fragments of repeated strings kept per report
+ENCODER_FRAGMENT_CACHE_SIZE = int(os.environ.get('AUTOPOSTURE_ENCODER_FRAGMENT_CACHE_SIZE', 4096))
+POST_SECURITY_REPORT_ROUTE = "/com.coralogix.xdr.ingestion.v1.SecurityReportIngestionService/PostSecurityReport"
+
+_SINGLE_BYTE_VARINTS = [bytes((n,)) for n in range(0x80)]
+
+# Field keys (field number << 3 | wire type)
+_REQUEST_SECURITY_REPORT = b"\x0a"
+_WRAPPED_STRING_VALUE = b"\x0a"
+_TIMESTAMP_SECONDS = b"\x08"
+_TIMESTAMP_NANOS = b"\x10"
+_REPORT_CONTEXT = b"\x0a"
+_REPORT_TEST_RESULT = b"\x12"
+_RESULT_NAME = b"\x1a"
+_RESULT_START_TIME = b"\x22"
+_RESULT_END_TIME = b"\x2a"
+_RESULT_ITEM = b"\x32"
+_RESULT_ITEM_TYPE = b"\x3a"
+_RESULT_TEST_FAILED = b"\x40\x01"
+_RESULT_ADDITIONAL_DATA = b"\x4a"
+_STRUCT_FIELDS_ENTRY = b"\x0a"
+_STRUCT_ENTRY_KEY = b"\x0a"
+_STRUCT_ENTRY_VALUE = b"\x12"
+_VALUE_NULL = b"\x08\x00"
+_VALUE_NUMBER = b"\x11"
+_VALUE_STRING = b"\x1a"
+_VALUE_STRUCT = b"\x2a"
+_VALUE_LIST = b"\x32"
+_LIST_VALUE_VALUES = b"\x0a"
+
+_pack_double = struct.Struct("<d").pack
+
+# Keys of a result that are message fields rather than additional data
+_RESULT_FIELD_KEYS = frozenset(dir(SecurityReportTestResult)) | {"test_name", "test_result"}
+
+
+def encode_varint(value: int) -> bytes:
+    if 0 <= value < 0x80:
+        return _SINGLE_BYTE_VARINTS[value]
+    if value < 0:
+        value += 1 << 64
+    output = bytearray()
+    while value > 0x7f:
+        output.append((value & 0x7f) | 0x80)
+        value >>= 7
+    output.append(value)
+    return bytes(output)
+
+
+def _length_delimited(key: bytes, payload) -> bytes:
+    return key + encode_varint(len(payload)) + payload
+
+
+def encode_wrapped_string(key: bytes, value: Optional[str]) -> bytes:
+    # google.protobuf.StringValue: an empty string is still sent as an empty wrapper
+    if value is None:
+        return b""
+    encoded = value.encode("utf-8")
+    if encoded:
+        encoded = _length_delimited(_WRAPPED_STRING_VALUE, encoded)
+    return _length_delimited(key, encoded)
+
+
+def encode_timestamp(key: bytes, value: datetime) -> bytes:
+    if value == betterproto.DATETIME_ZERO:
+        return b""
+    seconds = int(value.timestamp())
+    nanos = int(value.microsecond * 1e3)
+    payload = b""
+    if seconds:
+        payload += _TIMESTAMP_SECONDS + encode_varint(seconds)
+    if nanos:
+        payload += _TIMESTAMP_NANOS + encode_varint(nanos)
+    return _length_delimited(key, payload) if payload else b""
+
+
+def encode_value(value: Any) -> bytes:
+    # Mirrors struct_from_dict's conversions, bools are sent as numbers like there
+    if isinstance(value, str):
+        return _length_delimited(_VALUE_STRING, value.encode("utf-8"))
+    elif isinstance(value, int) or isinstance(value, float):
+        return _VALUE_NUMBER + _pack_double(float(value))
+    elif isinstance(value, datetime):
+        return _length_delimited(_VALUE_STRING, value.isoformat().encode("utf-8"))
+    elif isinstance(value, dict) and len(value) != 0 and isinstance(next(iter(value)), str):
+        return _length_delimited(_VALUE_STRUCT, encode_struct(value))
+    elif isinstance(value, list):
+        values = b"".join([_length_delimited(_LIST_VALUE_VALUES, encode_value(x)) for x in value])
+        return _length_delimited(_VALUE_LIST, values) if values else _VALUE_LIST + b"\x00"
+    return _VALUE_NULL
+
+
+def encode_struct_entry(key: str, value: Any) -> bytes:
+    encoded_key = key.encode("utf-8")
+    entry = _length_delimited(_STRUCT_ENTRY_KEY, encoded_key) if encoded_key else b""
+    entry += _length_delimited(_STRUCT_ENTRY_VALUE, encode_value(value))
+    return _length_delimited(_STRUCT_FIELDS_ENTRY, entry)
+
+
+def encode_struct(d: Dict[str, Any]) -> bytes:
+    return b"".join([encode_struct_entry(key, d[key]) for key in d])
+
+
+class SecurityReportEncoder:
+    # Encodes the PostSecurityReportRequest of a tester's results. The report is written into a buffer reused
+    # across reports, the fields shared by all the results of a report (timestamps) are encoded once per report.
+    # The results of a tester repeat the same few strings (test_name, item_type, the account identity in the
+    # additional data): their encoded fragments are kept for the duration of a report and spliced into each result.
+    def __init__(self, fragment_cache_size: int = ENCODER_FRAGMENT_CACHE_SIZE):
+        self._buffer = bytearray()
+        self._additional_data_templates_by_schema = {}
+        self._fragment_cache_size = fragment_cache_size
+        self._fragments = {}
+
+    def _additional_data_template(self, log_message):
+        # The additional data keys of a result schema, with their encoded Struct entry key prefix
+        schema = tuple(log_message)
+        template = self._additional_data_templates_by_schema.get(schema)
+        if template is None:
+            template = tuple((key, _length_delimited(_STRUCT_ENTRY_KEY, key.encode("utf-8")) if key else b"")
+                             for key in schema if key not in _RESULT_FIELD_KEYS)
+            self._additional_data_templates_by_schema[schema] = template
+        return template
+
+    def _cache_fragment(self, fragment_key, fragment: bytes) -> bytes:
+        # Unique values (item ids...) fill the cache up to its size, after that only the cached fragments are reused
+        if len(self._fragments) < self._fragment_cache_size:
+            self._fragments[fragment_key] = fragment
+        return fragment
+
+    def encode_test_result(self, log_message, encoded_time_range: bytes) -> bytes:
+        fragments = self._fragments
+        additional_data = bytearray()
+        for key, encoded_key in self._additional_data_template(log_message):
+            value = log_message[key]
+            if not value:
+                continue
+            if isinstance(value, str):
+                entry = fragments.get((key, value))
+                if entry is None:
+                    entry = self._cache_fragment((key, value), _length_delimited(
+                        _STRUCT_FIELDS_ENTRY, encoded_key + _length_delimited(_STRUCT_ENTRY_VALUE, encode_value(value))))
+                additional_data += entry
+            else:
+                entry = encoded_key + _length_delimited(_STRUCT_ENTRY_VALUE, encode_value(value))
+                additional_data += _STRUCT_FIELDS_ENTRY
+                additional_data += encode_varint(len(entry))
+                additional_data += entry
+
+        test_name = log_message["test_name"]
+        encoded_test_name = fragments.get((_RESULT_NAME, test_name))
+        if encoded_test_name is None:
+            encoded_test_name = self._cache_fragment((_RESULT_NAME, test_name),
+                                                     encode_wrapped_string(_RESULT_NAME, test_name))
+        item_type = log_message["item_type"]
+        encoded_item_type = fragments.get((_RESULT_ITEM_TYPE, item_type))
+        if encoded_item_type is None:
+            encoded_item_type = self._cache_fragment((_RESULT_ITEM_TYPE, item_type),
+                                                     encode_wrapped_string(_RESULT_ITEM_TYPE, item_type))
+
+        test_result = encoded_test_name + encoded_time_range + \
+            encode_wrapped_string(_RESULT_ITEM, log_message["item"]) + encoded_item_type
+        if log_message["test_result"] != "no_issue_found":
+            test_result += _RESULT_TEST_FAILED
+        return test_result + _RESULT_ADDITIONAL_DATA + encode_varint(len(additional_data)) + additional_data
+
+    def encode(self, context: SecurityReportContext, log_messages: Iterable[Dict[str, Any]],
+               start_time: datetime, end_time: datetime) -> bytes:
+        buffer = self._buffer
+        del buffer[:]
+        self._fragments.clear()
+        encoded_context = bytes(context)
+        if encoded_context:
+            buffer += _length_delimited(_REPORT_CONTEXT, encoded_context)
+        encoded_time_range = encode_timestamp(_RESULT_START_TIME, start_time) + \
+            encode_timestamp(_RESULT_END_TIME, end_time)
+        for log_message in log_messages:
+            test_result = self.encode_test_result(log_message, encoded_time_range)
+            buffer += _REPORT_TEST_RESULT
+            buffer += encode_varint(len(test_result))
+            buffer += test_result
+        return _length_delimited(_REQUEST_SECURITY_REPORT, buffer)
+
+
+class EncodedPostSecurityReportRequest:
+    # Stands in for PostSecurityReportRequest as the request type of the call: grpclib's proto codec sends
+    # the message SerializeToString() bytes, which are the already encoded payload
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+    def __bytes__(self) -> bytes:
+        return self.payload
+
+    def SerializeToString(self) -> bytes:
+        return self.payload
+
+
+async def post_encoded_security_report(channel: Channel, api_key: str, payload: bytes) -> PostSecurityReportResponse:
+    # Same call as SecurityReportIngestionServiceStub.post_security_report, made through grpclib's public
+    # Channel.request with the encoded request type instead of the stub's internal _unary_unary
+    async with channel.request(POST_SECURITY_REPORT_ROUTE, Cardinality.UNARY_UNARY, EncodedPostSecurityReportRequest,
+                               PostSecurityReportResponse, metadata=[('authorization', api_key)]) as stream:
+        await stream.send_message(EncodedPostSecurityReportRequest(payload), end=True)
+        return await stream.recv_message()
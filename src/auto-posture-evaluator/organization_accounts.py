@@ -0,0 +1,60 @@
+import os
+import re
+import time
+from typing import FrozenSet
+
+import boto3
+import botocore.exceptions
+
+import disk_cache
+
+ORGANIZATION_ACCOUNTS_TTL = int(os.environ.get('AUTOPOSTURE_ORGANIZATION_ACCOUNTS_TTL', 3600))
+
+_account_id_pattern = re.compile(r'\b\d{12}\b')
+_resolved_account_ids = {}
+
+
+def _list_organization_account_ids():
+    account_ids = []
+    paginator = boto3.client('organizations').get_paginator('list_accounts')
+    for page in paginator.paginate():
+        account_ids.extend(account['Id'] for account in page['Accounts'])
+    return account_ids
+
+
+def get_organization_account_ids(own_account_id) -> FrozenSet[str]:
+    # Resolved once per TTL, kept in memory and in the /tmp cache across warm Lambda invocations.
+    # Accounts that are not part of an organization (or lack the permission) only trust themselves,
+    # that fallback is not cached so the next run tries the lookup again.
+    cached = _resolved_account_ids.get(own_account_id)
+    if cached is not None and time.time() - cached[0] < ORGANIZATION_ACCOUNTS_TTL:
+        return cached[1]
+    cache_name = 'organization_accounts_' + own_account_id
+    account_ids = disk_cache.load(cache_name, ORGANIZATION_ACCOUNTS_TTL)
+    if account_ids is None:
+        try:
+            account_ids = _list_organization_account_ids()
+        except botocore.exceptions.ClientError:
+            _resolved_account_ids.pop(own_account_id, None)
+            return frozenset([own_account_id])
+        disk_cache.store(cache_name, account_ids)
+    resolved = frozenset(account_ids) | {own_account_id}
+    _resolved_account_ids[own_account_id] = (time.time(), resolved)
+    return resolved
+
+
+def is_external_principal(principal, organization_account_ids) -> bool:
+    # principal is the "Principal" element of an IAM policy statement
+    if principal == '*':
+        return True
+    if isinstance(principal, dict):
+        principal = principal.get('AWS', [])
+    if isinstance(principal, str):
+        principal = [principal]
+    for aws_principal in principal:
+        if aws_principal == '*':
+            return True
+        account_id = _account_id_pattern.search(aws_principal)
+        if account_id and account_id.group(0) not in organization_account_ids:
+            return True
+    return False
@@ -0,0 +1,79 @@
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional
+
+ISSUE_FOUND = "issue_found"
+NO_ISSUE_FOUND = "no_issue_found"
+
+
+class AccountIdentity:
+    # The identity the tester ran as, a single instance is shared by all the results of a tester
+    __slots__ = ('user', 'account_arn', 'account')
+
+    def __init__(self, user: Optional[str], account_arn: Optional[str], account: Optional[str]):
+        self.user = user
+        self.account_arn = account_arn
+        self.account = account
+
+
+class ResultRecord:
+    # Compact replacement for the result dicts. It is read like the legacy dict (same keys in the same order,
+    # the identity keys first), so the evaluator's validation and encoders handle both the same way.
+    __slots__ = ('identity', 'timestamp', 'item', 'item_type', 'test_name', 'test_result', 'extra')
+
+    _identity_keys = AccountIdentity.__slots__
+    _record_keys = ('timestamp', 'item', 'item_type', 'test_name', 'test_result')
+    _keys = _identity_keys + _record_keys
+
+    def __init__(self, identity: AccountIdentity, timestamp: float, item: str, item_type: str, test_name: str,
+                 test_result: str, extra: Optional[Dict[str, Any]] = None):
+        self.identity = identity
+        self.timestamp = timestamp
+        self.item = item
+        self.item_type = item_type
+        self.test_name = test_name
+        self.test_result = test_result
+        self.extra = extra
+
+    def __getitem__(self, key):
+        if key in ResultRecord._record_keys:
+            return getattr(self, key)
+        if key in ResultRecord._identity_keys:
+            return getattr(self.identity, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in ResultRecord._keys or (self.extra is not None and key in self.extra)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.extra is None:
+            return iter(ResultRecord._keys)
+        return iter(ResultRecord._keys + tuple(key for key in self.extra if key not in ResultRecord._keys))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return list(self)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+
+class ResultBuilder:
+    # Builds the ResultRecords of a tester. The identity is shared by all the records and the test names and
+    # item types are interned, so the repeated strings of a large scan are stored once.
+    def __init__(self, user: Optional[str], account_arn: Optional[str], account: Optional[str]):
+        self.identity = AccountIdentity(user, account_arn, account)
+
+    def result(self, item: str, item_type: str, test_name: str, issue_found: bool, **extra) -> ResultRecord:
+        return ResultRecord(self.identity, time.time(), item, sys.intern(item_type), sys.intern(test_name),
+                            ISSUE_FOUND if issue_found else NO_ISSUE_FOUND, extra or None)
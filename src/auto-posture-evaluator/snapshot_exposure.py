@@ -0,0 +1,72 @@
+import os
+from typing import Callable, Dict, Iterator, List
+
+from concurrency import DEFAULT_MAX_WORKERS, TokenBucket, bounded_map
+
+EC2_API_RATE = float(os.environ.get('AUTOPOSTURE_EC2_API_RATE', 20))
+RDS_API_RATE = float(os.environ.get('AUTOPOSTURE_RDS_API_RATE', 10))
+
+
+# The rate limiters of the scans are created once per tester run (TokenBucket(EC2_API_RATE) or
+# TokenBucket(RDS_API_RATE)) and shared by all its scans, so that a tester scanning its snapshots a page at a time
+# stays under the API's rate across the pages
+
+
+def scan_snapshot_exposure(snapshot_ids: List[str], is_public: Callable, rate_limiter: TokenBucket,
+                           max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[str, bool]:
+    # Returns snapshot id -> publicly restorable. is_public returns None for snapshots
+    # that disappeared during the scan, those are left out of the map.
+    def check(snapshot_id):
+        rate_limiter.acquire()
+        return is_public(snapshot_id)
+
+    exposure = {}
+    for snapshot_id, public in zip(snapshot_ids, bounded_map(check, snapshot_ids, max_workers)):
+        if public is not None:
+            exposure[snapshot_id] = public
+    return exposure
+
+
+def list_ebs_snapshots(ec2_client, owner_id) -> List[Dict]:
+    snapshots = []
+    paginator = ec2_client.get_paginator('describe_snapshots')
+    for page in paginator.paginate(OwnerIds=[owner_id], PaginationConfig={'PageSize': 1000}):
+        snapshots.extend(page['Snapshots'])
+    return snapshots
+
+
+def ebs_snapshot_exposure(ec2_client, snapshot_ids, rate_limiter: TokenBucket) -> Dict[str, bool]:
+    def is_public(snapshot_id):
+        try:
+            attributes = ec2_client.describe_snapshot_attribute(SnapshotId=snapshot_id,
+                                                                Attribute='createVolumePermission')
+        except ec2_client.exceptions.ClientError as ex:
+            if ex.response['Error']['Code'] == 'InvalidSnapshot.NotFound':
+                return None
+            raise ex
+        return any(permission.get('Group') == 'all' for permission in attributes['CreateVolumePermissions'])
+
+    return scan_snapshot_exposure(snapshot_ids, is_public, rate_limiter)
+
+
+def rds_db_snapshot_pages(rds_client) -> Iterator[List[Dict]]:
+    # The RDS snapshots a page at a time, for the testers streaming their results
+    paginator = rds_client.get_paginator('describe_db_snapshots')
+    for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+        yield page['DBSnapshots']
+
+
+def _is_restorable_by_all(attributes):
+    return any(attribute['AttributeName'] == 'restore' and 'all' in attribute['AttributeValues']
+               for attribute in attributes)
+
+
+def rds_db_snapshot_exposure(rds_client, snapshot_ids, rate_limiter: TokenBucket) -> Dict[str, bool]:
+    def is_public(snapshot_id):
+        try:
+            response = rds_client.describe_db_snapshot_attributes(DBSnapshotIdentifier=snapshot_id)
+        except rds_client.exceptions.DBSnapshotNotFoundFault:
+            return None
+        return _is_restorable_by_all(response['DBSnapshotAttributesResult']['DBSnapshotAttributes'])
+
+    return scan_snapshot_exposure(snapshot_ids, is_public, rate_limiter)
@@ -1,21 +1,27 @@
 from inspect import Attribute
-import time
-from typing import Dict, List, Set
+from typing import Dict, Iterator, List, Set
 import boto3
 import interfaces
 import datetime as dt
 from datetime import datetime
 import os
+from kms_keys import get_kms_key_aliases
+from concurrency import TokenBucket
+from snapshot_exposure import EC2_API_RATE, ebs_snapshot_exposure, list_ebs_snapshots
+from result_records import ResultBuilder
 
 class Tester(interfaces.TesterInterface):
     def __init__(self) -> None:
         self.aws_ec2_client = boto3.client('ec2')
         self.aws_ec2_resource = boto3.resource('ec2')
         self.aws_kms_client = boto3.client('kms')
+        self.ec2_rate_limiter = TokenBucket(EC2_API_RATE)
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
+        self._records = ResultBuilder(self.user_id, self.account_arn, self.account_id)
         self.ebs_volumes = []
+        self.ebs_snapshots = []
 
     def declare_tested_service(self) -> str:
         return 'ebs'
@@ -23,14 +29,14 @@ class Tester(interfaces.TesterInterface):
     def declare_tested_provider(self) -> str:
         return 'aws'
     
-    def run_tests(self) -> list:
+    def run_tests(self) -> Iterator[List]:
         self.ebs_volumes = self._get_ebs_volumes()
-        return \
-            self.get_volume_is_not_encrypted(self.ebs_volumes) + \
-            self.get_volume_attached_to_ec2(self.ebs_volumes) + \
-            self.get_volume_does_not_have_recent_snapshots(self.ebs_volumes) + \
-            self.get_volume_not_encrypted_with_kms_customer_keys(self.ebs_volumes) + \
-            self.get_volume_snapshots_are_public()
+        yield self.get_volume_is_not_encrypted(self.ebs_volumes)
+        yield self.get_volume_attached_to_ec2(self.ebs_volumes)
+        self.ebs_snapshots = list_ebs_snapshots(self.aws_ec2_client, self.account_id)
+        yield self.get_volume_does_not_have_recent_snapshots(self.ebs_volumes, self.ebs_snapshots)
+        yield self.get_volume_not_encrypted_with_kms_customer_keys(self.ebs_volumes)
+        yield self.get_volume_snapshots_are_public(self.ebs_snapshots)
 
     def _get_ebs_volumes(self):
         volumes = []
@@ -46,35 +52,22 @@ class Tester(interfaces.TesterInterface):
             volumes.extend(response['Volumes'])
         return volumes
 
+    def _get_latest_snapshot_time_by_volume(self, snapshots) -> Dict:
+        latest_snapshot_times = {}
+        for snapshot in snapshots:
+            volume_id = snapshot.get('VolumeId')
+            start_time = snapshot['StartTime']
+            if volume_id not in latest_snapshot_times or latest_snapshot_times[volume_id] < start_time:
+                latest_snapshot_times[volume_id] = start_time
+        return latest_snapshot_times
+
     def get_volume_is_not_encrypted(self, volumes) -> List:
         result = []
         test_name = "volume_is_not_encrypted"
 
         for volume in volumes:
-            volume_id = volume['VolumeId']
-            if not volume['Encrypted']:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "issue_found"
-                })
-            else:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "no_issue_found"
-                })
-        
+            result.append(self._records.result(volume['VolumeId'], "ebs_volume", test_name,
+                                               issue_found=not volume['Encrypted']))
         return result
 
     def get_volume_attached_to_ec2(self, volumes):
@@ -82,159 +75,45 @@ class Tester(interfaces.TesterInterface):
         test_name = "volume_attached_to_ec2"
 
         for volume in volumes:
-            volume_id = volume['VolumeId']
-            attachments = volume['Attachments']
-            if len(attachments) > 0:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "issue_found"
-                })
-            else:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "no_issue_found"
-                })
-        
+            result.append(self._records.result(volume['VolumeId'], "ebs_volume", test_name,
+                                               issue_found=len(volume['Attachments']) > 0))
         return result
     
-    def get_volume_does_not_have_recent_snapshots(self, volumes):
+    def get_volume_does_not_have_recent_snapshots(self, volumes, snapshots):
         result = []
         test_name = "volume_does_not_have_recent_snapshots"
-        
+        latest_snapshot_times = self._get_latest_snapshot_time_by_volume(snapshots)
+        current_date = datetime.now(tz=dt.timezone.utc)
+        threshold = int(os.environ.get('THRESHOLD', 7))
+
         for volume in volumes:
-            snapshots = []
             volume_id = volume['VolumeId']
-            can_paginate_snapshot = self.aws_ec2_client.can_paginate('describe_snapshots')
-            if can_paginate_snapshot:
-                paginator_snap = self.aws_ec2_client.get_paginator('describe_snapshots')
-                snap_response_iterator = paginator_snap.paginate(PaginationConfig={'PageSize': 50}, Filters=[{'Name': 'volume-id', 'Values': [volume_id]}])
-                for page in snap_response_iterator:
-                    snapshots.extend(page['Snapshots'])
-            else:
-                snap_response = self.aws_ec2_client.describe_snapshots(Filters=[{'Name': 'volume-id', 'Values': [volume_id]}])
-                snapshots.extend(snap_response['Snapshots'])
-            recent_snapshot_found = False
-            for snapshot in snapshots:
-                if snapshot['State'] != 'completed': pass
-                create_date = snapshot['StartTime']
-                current_date = datetime.now(tz=dt.timezone.utc)
-                time_diff = (current_date - create_date).days
-                if time_diff<os.environ.get('THRESHOLD', 7):
-                    recent_snapshot_found = True
-                    break
-            if recent_snapshot_found:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "no_issue_found"
-                })
-            else:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "issue_found"
-                })
+            latest_snapshot_time = latest_snapshot_times.get(volume_id)
+            recent_snapshot_found = latest_snapshot_time is not None and \
+                (current_date - latest_snapshot_time).days < threshold
+            result.append(self._records.result(volume_id, "ebs_volume", test_name,
+                                               issue_found=not recent_snapshot_found))
         return result
 
     def get_volume_not_encrypted_with_kms_customer_keys(self, volumes):
         result = []
         test_name = "volume_not_encrypted_with_kms_customer_keys"
-        
+        aliases_by_key = get_kms_key_aliases(self.aws_kms_client, self.account_id)
+
         for volume in volumes:
-            volume_id = volume['VolumeId']
             if not volume['Encrypted'] or not volume['KmsKeyId']:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": volume_id,
-                    "item_type": "ebs_volume",
-                    "test_name": test_name,
-                    "test_result": "issue_found"
-                })
+                issue_found = True
             else:
-                key_id = volume['KmsKeyId']
-                kms_response = self.aws_kms_client.list_aliases(KeyId=key_id)
-                issue_found = False
-                for alias in kms_response['Aliases']:
-                    if alias['AliasName'] == 'alias/aws/ebs':
-                        issue_found = True
-                        break                    
-                if not issue_found:
-                    result.append({
-                        "user": self.user_id,
-                        "account_arn": self.account_arn,
-                        "account": self.account_id,
-                        "timestamp": time.time(),
-                        "item": volume_id,
-                        "item_type": "ebs_volume",
-                        "test_name": test_name,
-                        "test_result": "no_issue_found"
-                    })
-                else:
-                    result.append({
-                        "user": self.user_id,
-                        "account_arn": self.account_arn,
-                        "account": self.account_id,
-                        "timestamp": time.time(),
-                        "item": volume_id,
-                        "item_type": "ebs_volume",
-                        "test_name": test_name,
-                        "test_result": "issue_found"
-                    })
+                issue_found = 'alias/aws/ebs' in aliases_by_key.get(volume['KmsKeyId'], [])
+            result.append(self._records.result(volume['VolumeId'], "ebs_volume", test_name, issue_found=issue_found))
         return result
 
-    def get_volume_snapshots_are_public(self):
+    def get_volume_snapshots_are_public(self, snapshots):
         test_name = "volume_snapshots_are_public"
         result = []
-        snapshots = self.aws_ec2_client.describe_snapshots(OwnerIds=[self.account_id], Filters=[{"Name": "status", "Values":["completed"]}])
-        
-        for snapshot in snapshots["Snapshots"]:
-            snapshot_id = snapshot["SnapshotId"]
-            attrs = self.aws_ec2_client.describe_snapshot_attribute(SnapshotId=snapshot_id, Attribute="createVolumePermission")
-            if any([attr["Group"]=="all" for attr in attrs["CreateVolumePermissions"]]):
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": snapshot_id,
-                    "item_type": "ebs_snapshot",
-                    "test_name": test_name,
-                    "test_result": "issue_found"
-                })
-            else:
-                result.append({
-                    "user": self.user_id,
-                    "account_arn": self.account_arn,
-                    "account": self.account_id,
-                    "timestamp": time.time(),
-                    "item": snapshot_id,
-                    "item_type": "ebs_snapshot",
-                    "test_name": test_name,
-                    "test_result": "no_issue_found"
-                })
-        return result
\ No newline at end of file
+        completed_snapshot_ids = [snapshot['SnapshotId'] for snapshot in snapshots if snapshot['State'] == 'completed']
+        exposure = ebs_snapshot_exposure(self.aws_ec2_client, completed_snapshot_ids, self.ec2_rate_limiter)
+
+        for snapshot_id, is_public in exposure.items():
+            result.append(self._records.result(snapshot_id, "ebs_snapshot", test_name, issue_found=is_public))
+        return result
@@ -1,6 +1,11 @@
+import os
+import re
 import time
 import boto3
 import interfaces
+import disk_cache
+
+ENGINE_VERSIONS_TTL = int(os.environ.get('AUTOPOSTURE_ENGINE_VERSIONS_TTL', 21600))
 
 
 def _return_default_port_on_elasticache_engines(cluster_type):
@@ -12,6 +17,17 @@ def _return_default_port_on_elasticache_engines(cluster_type):
         return None
 
 
+def _parse_version(version):
+    # "6.2.6" -> (6, 2, 6), wildcard versions like "6.x" -> (6,)
+    return tuple(int(number) for number in re.findall(r'\d+', version or ''))
+
+
+def _return_effective_version(engine_version):
+    # Wildcard catalog entries (e.g. redis "6.x") carry the actual version at the end of their description
+    return max(_parse_version(engine_version['EngineVersion']),
+               _parse_version(engine_version.get('CacheEngineVersionDescription', '').split(' ')[-1]))
+
+
 class Tester(interfaces.TesterInterface):
     def __init__(self):
         self.aws_elasticache_client = boto3.client('elasticache')
@@ -19,7 +35,8 @@ class Tester(interfaces.TesterInterface):
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
-        self.elasticache_clusters = self.aws_elasticache_client.describe_cache_clusters(ShowCacheNodeInfo=True)
+        self.elasticache_clusters = self._return_all_cache_clusters()
+        self.latest_engine_versions = {}
 
     def declare_tested_service(self) -> str:
         return 'elasticache'
@@ -44,13 +61,32 @@ class Tester(interfaces.TesterInterface):
             "test_result": issue_status
         }
 
+    def _return_all_cache_clusters(self):
+        clusters = []
+        paginator = self.aws_elasticache_client.get_paginator('describe_cache_clusters')
+        for page in paginator.paginate(ShowCacheNodeInfo=True, PaginationConfig={'PageSize': 100}):
+            clusters.extend(page['CacheClusters'])
+        return clusters
+
+    def _fetch_latest_version_for_given_engine(self, engine_type):
+        latest_version = ()
+        paginator = self.aws_elasticache_client.get_paginator('describe_cache_engine_versions')
+        for page in paginator.paginate(Engine=engine_type, DefaultOnly=False, PaginationConfig={'PageSize': 100}):
+            for engine_version in page['CacheEngineVersions']:
+                latest_version = max(latest_version, _return_effective_version(engine_version))
+        return latest_version
+
     def _return_latest_version_for_given_engine(self, engine_type):
-        versions = self.aws_elasticache_client.describe_cache_engine_versions(
-            DefaultOnly=False,
-            Engine=engine_type,
-            MaxRecords=100,
-        )
-        return versions['CacheEngineVersions'][-1]
+        # The catalog only changes with new ElastiCache releases, it is fetched once per engine
+        # and kept on disk across warm invocations
+        if engine_type not in self.latest_engine_versions:
+            cache_name = 'elasticache_engine_versions_' + self.aws_elasticache_client.meta.region_name + '_' + engine_type
+            latest_version = disk_cache.load(cache_name, ENGINE_VERSIONS_TTL)
+            if latest_version is None:
+                latest_version = self._fetch_latest_version_for_given_engine(engine_type)
+                disk_cache.store(cache_name, latest_version)
+            self.latest_engine_versions[engine_type] = tuple(latest_version)
+        return self.latest_engine_versions[engine_type]
 
     def _return_cluster_using_default_port(self, engine_type, elasticache):
         engine_default_port = _return_default_port_on_elasticache_engines(engine_type)
@@ -62,7 +98,7 @@ class Tester(interfaces.TesterInterface):
     def detect_elasticache_cluster_not_using_default_port(self):
         test_name = "elasticache_cluster_not_using_default_port"
         result = []
-        for elasticache in self.elasticache_clusters['CacheClusters']:
+        for elasticache in self.elasticache_clusters:
             if self._return_cluster_using_default_port(elasticache['Engine'], elasticache):
                 result.append(self._append_elasticache_test_result(elasticache, test_name, "issue_found"))
             else:
@@ -73,7 +109,7 @@ class Tester(interfaces.TesterInterface):
     def detect_elasticache_cluster_using_vpc(self):
         test_name = "elasticache_cluster_using_vpc"
         result = []
-        for elasticache in self.elasticache_clusters['CacheClusters']:
+        for elasticache in self.elasticache_clusters:
             if 'CacheSubnetGroupName' in elasticache and elasticache['CacheSubnetGroupName']:
                 result.append(self._append_elasticache_test_result(elasticache, test_name, "no_issue_found"))
             else:
@@ -83,13 +119,9 @@ class Tester(interfaces.TesterInterface):
     def detect_elasticache_cluster_using_latest_engine_version(self):
         test_name = "elasticache_cluster_using_latest_engine_version"
         result = []
-        for elasticache in self.elasticache_clusters['CacheClusters']:
-            if self._return_latest_version_for_given_engine(elasticache['Engine'])[
-                        'CacheEngineVersionDescription'].split(
-                        ' ')[-1] != elasticache[
-                        'EngineVersion'] and self._return_latest_version_for_given_engine(elasticache['Engine'])[
-                        'EngineVersion'] != elasticache[
-                        'EngineVersion']:
+        for elasticache in self.elasticache_clusters:
+            if _parse_version(elasticache['EngineVersion']) < \
+                    self._return_latest_version_for_given_engine(elasticache['Engine']):
                 result.append(self._append_elasticache_test_result(elasticache, test_name, "issue_found"))
             else:
                 result.append(self._append_elasticache_test_result(elasticache, test_name, "no_issue_found"))
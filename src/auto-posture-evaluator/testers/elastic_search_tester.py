@@ -1,7 +1,12 @@
 import time
 import boto3
+import botocore.exceptions
 import interfaces
 import json
+from concurrency import bounded_map
+
+# describe_domains / describe_elasticsearch_domains accept at most 5 domain names per call
+DESCRIBE_DOMAINS_BATCH_SIZE = 5
 
 
 def _format_string_to_json(text):
@@ -15,7 +20,7 @@ class Tester(interfaces.TesterInterface):
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
-        self.elastic_search_domain_names = self.aws_elastic_search_client.list_domain_names()
+        self.elastic_search_domains = []
 
     def declare_tested_service(self) -> str:
         return 'elastic_search'
@@ -24,6 +29,7 @@ class Tester(interfaces.TesterInterface):
         return 'aws'
 
     def run_tests(self) -> list:
+        self.elastic_search_domains = self._collect_domain_inventory()
         return self.detect_elastic_search_cluster_using_vpc() + \
                self.detect_elastic_search_cluster_encryption_enabled() + \
                self.detect_elastic_search_cluster_using_kms_cmk() + \
@@ -42,9 +48,47 @@ class Tester(interfaces.TesterInterface):
             "test_result": issue_status
         }
 
+    def _describe_domains(self, client, describe_operation, domain_names):
+        batches = [domain_names[i:i + DESCRIBE_DOMAINS_BATCH_SIZE]
+                   for i in range(0, len(domain_names), DESCRIBE_DOMAINS_BATCH_SIZE)]
+        describe = getattr(client, describe_operation)
+        domain_statuses = []
+        for response in bounded_map(lambda batch: describe(DomainNames=batch), batches):
+            domain_statuses.extend(response['DomainStatusList'])
+        return domain_statuses
+
+    def _return_all_domain_statuses(self):
+        # The OpenSearch API covers both OpenSearch and Elasticsearch domains and reports the same
+        # DomainStatus fields the detectors use. Older botocore versions or roles only granted the
+        # legacy es:DescribeElasticsearchDomains action fall back to the Elasticsearch API.
+        try:
+            opensearch_client = boto3.client('opensearch')
+            domain_names = [domain['DomainName'] for domain in opensearch_client.list_domain_names()['DomainNames']]
+            return self._describe_domains(opensearch_client, 'describe_domains', domain_names)
+        except botocore.exceptions.UnknownServiceError:
+            pass
+        except botocore.exceptions.ClientError as ex:
+            if ex.response['Error']['Code'] != 'AccessDeniedException':
+                raise ex
+        domain_names = [domain['DomainName'] for domain in
+                        self.aws_elastic_search_client.list_domain_names()['DomainNames']]
+        return self._describe_domains(self.aws_elastic_search_client, 'describe_elasticsearch_domains', domain_names)
+
+    def _collect_domain_inventory(self):
+        domains = []
+        for domain_status in self._return_all_domain_statuses():
+            access_policies = domain_status.get('AccessPolicies')
+            domains.append({
+                "DomainName": domain_status['DomainName'],
+                "DomainStatus": domain_status,
+                "AccessPolicies": _format_string_to_json(access_policies) if access_policies else None
+            })
+        return domains
+
     def _check_es_domain_not_publicly_accessible(self, access_policy):
-        access_policy = _format_string_to_json(access_policy)
         is_exposed = False
+        if not access_policy:
+            return is_exposed
         for statement in access_policy['Statement']:
             if 'Effect' in statement and statement['Effect'] == 'Deny':
                 continue
@@ -52,7 +96,7 @@ class Tester(interfaces.TesterInterface):
                 'AWS'] == '*' and 'Condition' not in statement:
                 is_exposed = True
                 break
-            if 'IpAddress' in statement['Condition'] and 'aws:SourceIp' in statement['Condition'][
+            if 'IpAddress' in statement.get('Condition', {}) and 'aws:SourceIp' in statement['Condition'][
                 'IpAddress'] and '0.0.0.0/0' in statement['Condition']['IpAddress']['aws:SourceIp']:
                 is_exposed = True
                 break
@@ -61,14 +105,12 @@ class Tester(interfaces.TesterInterface):
     def detect_elastic_search_cluster_using_latest_engine_version(self):
         test_name = "elastic_search_cluster_using_latest_engine_version"
         result = []
-        for elastic_search in self.elastic_search_domain_names['DomainNames']:
-            domain_description = self.aws_elastic_search_client.describe_elasticsearch_domain(
-                DomainName=elastic_search['DomainName'])
+        for elastic_search in self.elastic_search_domains:
             try:
-                if domain_description['DomainStatus']['ServiceSoftwareOptions']['CurrentVersion'] == \
-                        domain_description['DomainStatus']['ServiceSoftwareOptions']['NewVersion'] or (
-                        domain_description['DomainStatus']['ServiceSoftwareOptions']['NewVersion'] == '' and
-                        domain_description['DomainStatus']['ServiceSoftwareOptions']['UpdateAvailable'] == False):
+                if elastic_search['DomainStatus']['ServiceSoftwareOptions']['CurrentVersion'] == \
+                        elastic_search['DomainStatus']['ServiceSoftwareOptions']['NewVersion'] or (
+                        elastic_search['DomainStatus']['ServiceSoftwareOptions']['NewVersion'] == '' and
+                        elastic_search['DomainStatus']['ServiceSoftwareOptions']['UpdateAvailable'] == False):
                     result.append(
                         self._append_elastic_search_test_result(elastic_search, test_name, "no_issue_found"))
                 else:
@@ -80,13 +122,11 @@ class Tester(interfaces.TesterInterface):
     def detect_elastic_search_cluster_using_vpc(self):
         test_name = "elastic_search_cluster_using_vpc"
         result = []
-        for elastic_search in self.elastic_search_domain_names['DomainNames']:
-            domain_description = self.aws_elastic_search_client.describe_elasticsearch_domain(
-                DomainName=elastic_search['DomainName'])
+        for elastic_search in self.elastic_search_domains:
             try:
-                if 'VPCOptions' in domain_description['DomainStatus'] and \
-                        domain_description['DomainStatus']['VPCOptions']['VPCId'] and len(
-                    domain_description['DomainStatus']['VPCOptions']['SubnetIds']):
+                if 'VPCOptions' in elastic_search['DomainStatus'] and \
+                        elastic_search['DomainStatus']['VPCOptions']['VPCId'] and len(
+                    elastic_search['DomainStatus']['VPCOptions']['SubnetIds']):
                     result.append(self._append_elastic_search_test_result(elastic_search, test_name, "no_issue_found"))
                 else:
                     result.append(self._append_elastic_search_test_result(elastic_search, test_name, "issue_found"))
@@ -97,11 +137,9 @@ class Tester(interfaces.TesterInterface):
     def detect_elastic_search_cluster_encryption_enabled(self):
         test_name = "elastic_search_cluster_encryption_enabled"
         result = []
-        for elastic_search in self.elastic_search_domain_names['DomainNames']:
-            domain_description = self.aws_elastic_search_client.describe_elasticsearch_domain(
-                DomainName=elastic_search['DomainName'])
+        for elastic_search in self.elastic_search_domains:
             try:
-                if domain_description['DomainStatus']['EncryptionAtRestOptions']['Enabled']:
+                if elastic_search['DomainStatus']['EncryptionAtRestOptions']['Enabled']:
                     result.append(self._append_elastic_search_test_result(elastic_search, test_name, "no_issue_found"))
                 else:
                     result.append(self._append_elastic_search_test_result(elastic_search, test_name, "issue_found"))
@@ -112,12 +150,10 @@ class Tester(interfaces.TesterInterface):
     def detect_elastic_search_cluster_using_kms_cmk(self):
         test_name = "elastic_search_cluster_using_kms_cmk"
         result = []
-        for elastic_search in self.elastic_search_domain_names['DomainNames']:
-            domain_description = self.aws_elastic_search_client.describe_elasticsearch_domain(
-                DomainName=elastic_search['DomainName'])
+        for elastic_search in self.elastic_search_domains:
             try:
-                if domain_description['DomainStatus']['EncryptionAtRestOptions']['Enabled'] == True and \
-                        domain_description['DomainStatus']['EncryptionAtRestOptions'][
+                if elastic_search['DomainStatus']['EncryptionAtRestOptions']['Enabled'] == True and \
+                        elastic_search['DomainStatus']['EncryptionAtRestOptions'][
                             'KmsKeyId'] != '(Default) aws/es':
                     result.append(self._append_elastic_search_test_result(elastic_search, test_name, "no_issue_found"))
                 else:
@@ -129,10 +165,8 @@ class Tester(interfaces.TesterInterface):
     def detect_elastic_search_domain_not_publicly_accessible(self):
         test_name = "elastic_search_domain_not_publicly_accessible"
         result = []
-        for elastic_search in self.elastic_search_domain_names['DomainNames']:
-            domain_description = self.aws_elastic_search_client.describe_elasticsearch_domain(
-                DomainName=elastic_search['DomainName'])
-            if self._check_es_domain_not_publicly_accessible(domain_description['DomainStatus']['AccessPolicies']):
+        for elastic_search in self.elastic_search_domains:
+            if self._check_es_domain_not_publicly_accessible(elastic_search['AccessPolicies']):
                 result.append(self._append_elastic_search_test_result(elastic_search, test_name, "issue_found"))
             else:
                 result.append(self._append_elastic_search_test_result(elastic_search, test_name, "no_issue_found"))
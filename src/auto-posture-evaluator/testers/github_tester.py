@@ -1,31 +1,42 @@
+import asyncio
+import itertools
 import os
 import time
-import requests
 import interfaces
+import disk_cache
+from github_client import GitHubClient, GitHubRateLimitExhausted
+
+DEFERRED_SCANS_CACHE_NAME = 'github_deferred_scans'
+DEFERRED_SCANS_TTL = int(os.environ.get('AUTOPOSTURE_GITHUB_DEFERRED_SCANS_TTL', 7 * 24 * 3600))
 
 
 class Tester(interfaces.TesterInterface):
     def __init__(self):
         self.github_authorization_token = os.environ.get('AUTOPOSTURE_GITHUB_TOKEN')
         self.github_organizations = os.environ.get('AUTOPOSTURE_GITHUB_ORGANIZATIONS')
+        # Lower priorities run first: the cheapest checks (in requests per organization) go first
+        # so a rate limited run still covers as many organizations as possible
         self.tests = {
             "users_without_mfa": {
                 "method": self.get_users_without_mfa,
-                "result_item_type": "github_user"
+                "result_item_type": "github_user",
+                "priority": 1
             },
             "forking_enabled_repos": {
                 "method": self.get_forkable_repositories,
-                "result_item_type": "github_repository"
+                "result_item_type": "github_repository",
+                "priority": 2
             },
             "too_many_admin_users_per_org": {
                 "method": self.check_for_too_many_admin_users,
-                "result_item_type": "github_organization"
+                "result_item_type": "github_organization",
+                "priority": 0
             }
         }
-        self.request_headers = {
-            "Authorization": "token " + self.github_authorization_token,
-            "Accept": "application/vnd.github.v3+json"
-        }
+        # Created and closed by every run_tests, see _run_tests
+        self.github_client = None
+        # The (test name, organization) scans the last run deferred to the next one
+        self.deferred_scans = []
 
     def declare_tested_service(self) -> str:
         return 'github'
@@ -34,62 +45,107 @@ class Tester(interfaces.TesterInterface):
         return 'github'
 
     def run_tests(self) -> list:
+        return asyncio.run(self._run_tests())
+
+    def run_complete(self) -> bool:
+        return not self.deferred_scans
+
+    async def _run_scan(self, test_name, organization):
+        try:
+            return await self.tests[test_name]["method"](organization)
+        except GitHubRateLimitExhausted:
+            return None
+
+    async def _run_scheduled_scans(self, scans):
+        # Scans run tier by tier: the ones deferred by the previous run first, then by priority.
+        # Within a tier every (test, organization) pair runs concurrently, the client bounds the actual
+        # concurrency. Once the rate limit budget is exhausted the remaining scans are deferred.
+        previously_deferred = set(tuple(scan) for scan in disk_cache.load(DEFERRED_SCANS_CACHE_NAME,
+                                                                         DEFERRED_SCANS_TTL) or [])
+
+        def tier(scan):
+            return scan not in previously_deferred, self.tests[scan[0]]["priority"]
+
+        completed_scans = []
+        deferred_scans = []
+        for _, tier_scans in itertools.groupby(sorted(scans, key=tier), key=tier):
+            tier_scans = list(tier_scans)
+            if self.github_client.exhausted:
+                deferred_scans.extend(tier_scans)
+                continue
+            tier_raw_results = await asyncio.gather(
+                *[self._run_scan(test_name, organization) for test_name, organization in tier_scans])
+            for scan, raw_results in zip(tier_scans, tier_raw_results):
+                if raw_results is None:
+                    deferred_scans.append(scan)
+                else:
+                    completed_scans.append((scan, raw_results))
+
+        disk_cache.store(DEFERRED_SCANS_CACHE_NAME, deferred_scans)
+        self.deferred_scans = deferred_scans
+        if deferred_scans:
+            print("WARN: The GitHub rate limit budget is exhausted, " + str(len(deferred_scans)) +
+                  " scans are deferred to the next run")
+        return completed_scans
+
+    async def _run_tests(self) -> list:
+        async with GitHubClient(self.github_authorization_token) as self.github_client:
+            organizations_list = await self.get_organizations_list(self.github_organizations)
+            scans = [(test_name, organization) for test_name in self.tests.keys()
+                     for organization in organizations_list]
+            completed_scans = await self._run_scheduled_scans(scans)
+
         results = []
-        organizations_list = self.get_organizations_list(self.github_organizations)
-        for test_name in self.tests.keys():
-            for organization in organizations_list:
-                raw_results = self.tests[test_name]["method"](organization)
-                if len(raw_results) > 0:
-                    for item in raw_results:
-                        if item["issue"]:
-                            results.append({
-                                "timestamp": time.time(),
-                                "account": organization,
-                                "item": item["item"],
-                                "item_type": self.tests[test_name]["result_item_type"],
-                                "test_name": test_name,
-                                "test_result": "issue_found"
-                            })
-                        else:
-                            results.append({
-                                "timestamp": time.time(),
-                                "account": organization,
-                                "item": item["item"],
-                                "item_type": self.tests[test_name]["result_item_type"],
-                                "test_name": test_name,
-                                "test_result": "no_issue_found"})
+        for (test_name, organization), raw_results in completed_scans:
+            for item in raw_results:
+                if item["issue"]:
+                    results.append({
+                        "timestamp": time.time(),
+                        "account": organization,
+                        "item": item["item"],
+                        "item_type": self.tests[test_name]["result_item_type"],
+                        "test_name": test_name,
+                        "test_result": "issue_found"
+                    })
+                else:
+                    results.append({
+                        "timestamp": time.time(),
+                        "account": organization,
+                        "item": item["item"],
+                        "item_type": self.tests[test_name]["result_item_type"],
+                        "test_name": test_name,
+                        "test_result": "no_issue_found"})
 
         return results
 
-    def get_organizations_list(self, organizations):
+    async def get_organizations_list(self, organizations):
         if organizations is not None:
             return str(organizations).split(',')
         else:
-            raw_results = requests.get(headers=self.request_headers, url='https://api.github.com/user/orgs')
-            raw_results_obj = raw_results.json()
+            raw_results_obj = await self.github_client.get_all('/user/orgs', fields=("login",))
             result = []
             for organization in raw_results_obj:
                 result.append(organization["login"])
             return result
 
-    def get_users_without_mfa(self, organization):
+    async def get_users_without_mfa(self, organization):
         result = []
-        raw_api_result_all_users = requests.get(headers=self.request_headers, url='https://api.github.com/orgs/' + organization + '/members')
-        raw_api_result_all_users_obj = raw_api_result_all_users.json()
-        raw_api_result_2fa_disabled = requests.get(headers=self.request_headers, url='https://api.github.com/orgs/' + organization + '/members?filter=2fa_disabled')
-        raw_api_result_2fa_disabled_obj = raw_api_result_2fa_disabled.json()
+        raw_api_result_all_users_obj, raw_api_result_2fa_disabled_obj = await asyncio.gather(
+            self.github_client.get_all('/orgs/' + organization + '/members', fields=("login",)),
+            self.github_client.get_all('/orgs/' + organization + '/members?filter=2fa_disabled', fields=("login",)))
+        users_with_2fa_disabled = set(user["login"] for user in raw_api_result_2fa_disabled_obj)
         for user in raw_api_result_all_users_obj:
-            if user["login"] in [u.login for u in raw_api_result_2fa_disabled_obj]:
+            if user["login"] in users_with_2fa_disabled:
                 result.append({"item": user["login"] + "@@" + organization, "issue": True})
             else:
                 result.append({"item": user["login"] + "@@" + organization, "issue": False})
 
         return result
 
-    def get_forkable_repositories(self, organization):
+    async def get_forkable_repositories(self, organization):
         result = []
-        raw_api_result = requests.get(headers=self.request_headers, url='https://api.github.com/orgs/' + organization + '/repos')
-        raw_api_result_obj = raw_api_result.json()
+        raw_api_result_obj = await self.github_client.get_all('/orgs/' + organization + '/repos',
+                                                              fields=("name", "allow_forking"))
         for repo in raw_api_result_obj:
             if repo["allow_forking"]:
                 result.append({"item": repo["name"], "issue": True})
@@ -98,11 +154,11 @@ class Tester(interfaces.TesterInterface):
 
         return result
 
-    def check_for_too_many_admin_users(self, organization):
+    async def check_for_too_many_admin_users(self, organization):
         result = []
         org_admins = []
-        raw_api_result = requests.get(headers=self.request_headers, url='https://api.github.com/orgs/' + organization + '/members?role=admin')
-        raw_api_result_obj = raw_api_result.json()
+        raw_api_result_obj = await self.github_client.get_all('/orgs/' + organization + '/members?role=admin',
+                                                              fields=("login",))
         for user in raw_api_result_obj:
             org_admins.append(user["login"])
         if len(org_admins) > 15:
@@ -1,6 +1,7 @@
 import interfaces
 import boto3
 import time
+from kms_keys import get_kms_key_snapshot, is_customer_managed
 
 class Tester(interfaces.TesterInterface):
     def __init__(self) -> None:
@@ -8,7 +9,7 @@ class Tester(interfaces.TesterInterface):
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account') 
-        self.kms_keys = []
+        self.kms_keys = {}
     def declare_tested_provider(self) -> str:
         return 'aws'
 
@@ -16,34 +17,19 @@ class Tester(interfaces.TesterInterface):
         return 'kms'
 
     def run_tests(self) -> list:
-        self.kms_keys = self._get_kms_keys()
+        self.kms_keys = get_kms_key_snapshot(self.aws_kms_client, self.account_id)
         return \
             self.get_rotation_for_cmks_is_enabled(self.kms_keys) + \
             self.get_kms_cmk_pending_deletion(self.kms_keys)
-    
-    def _get_kms_keys(self):
-        keys = []
-        can_paginate = self.aws_kms_client.can_paginate('list_keys')
-        if can_paginate:
-            paginator = self.aws_kms_client.get_paginator('list_keys')
-            response_iterator = paginator.paginate(PaginationConfig={'PageSize': 50})
 
-            for page in response_iterator:
-                keys.extend(page['Keys'])
-        else:
-            response = self.aws_kms_client.list_keys()
-            keys.extend(response['Keys'])
-        return keys
-    
     def get_rotation_for_cmks_is_enabled(self, keys):
         result = []
         test_name = "rotation_for_cmks_is_enabled"
 
-        for key in keys:
-            key_id = key['KeyId']
-            response = self.aws_kms_client.get_key_rotation_status(KeyId = key_id)
-            rotation_status = response['KeyRotationEnabled']
-            if rotation_status:
+        for key_id, key in keys.items():
+            if not is_customer_managed(key['metadata']) or key['rotation_enabled'] is None:
+                continue
+            if key['rotation_enabled']:
                 result.append({
                     "user": self.user_id,
                     "account_arn": self.account_arn,
@@ -71,11 +57,8 @@ class Tester(interfaces.TesterInterface):
         result = []
         test_name = "kms_cmk_pending_deletion"
 
-        for key in keys:
-            key_id = key['KeyId']
-            response = self.aws_kms_client.describe_key(KeyId = key_id)
-            rotation_status = response['KeyMetadata']['KeyState']
-            if rotation_status == 'PendingDeletion':
+        for key_id, key in keys.items():
+            if key['metadata']['KeyState'] == 'PendingDeletion':
                 result.append({
                     "user": self.user_id,
                     "account_arn": self.account_arn,
@@ -1,29 +1,51 @@
+import collections
+import functools
 import time
+from typing import Iterator, List, Optional
 import boto3
 import interfaces
+from concurrency import TokenBucket
+from snapshot_exposure import RDS_API_RATE, rds_db_snapshot_pages, rds_db_snapshot_exposure
 
 
+# Matched in order against the lower cased engine name, postgres comes first so aurora-postgresql isn't
+# taken for a MySQL compatible engine and mysql before sql so it isn't taken for SQL Server
+_default_port_by_engine_keyword = (
+    ('postgres', 5432),
+    ('mysql', 3306),
+    ('aurora', 3306),
+    ('maria', 3306),
+    ('oracle', 1521),
+    ('sql', 1433),
+)
+
+
+@functools.lru_cache(maxsize=None)
 def _return_default_port_on_rds_engines(db_engine):
-    if 'mysql' in db_engine.lower() or 'aurora' in db_engine.lower() or 'maria' in db_engine.lower():
-        return 3306
-    elif 'postgres' in db_engine.lower():
-        return 5432
-    elif 'oracle' in db_engine.lower():
-        return 1521
-    elif 'sql' in db_engine.lower():
-        return 1433
+    db_engine = db_engine.lower()
+    for engine_keyword, default_port in _default_port_by_engine_keyword:
+        if engine_keyword in db_engine:
+            return default_port
     return
 
 
+def _compact_db_cluster(cluster):
+    return {
+        "identifier": cluster['DBClusterIdentifier'],
+        "engine": cluster['Engine']
+    }
+
+
 class Tester(interfaces.TesterInterface):
     def __init__(self):
         self.aws_rds_client = boto3.client('rds')
+        self.rds_rate_limiter = TokenBucket(RDS_API_RATE)
+        self.rds_clusters = []
+        self.inventory_counts = collections.Counter()
         self.cache = {}
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
-        self.rds_instances = self.aws_rds_client.describe_db_instances()
-        self.rds_snapshots = self.aws_rds_client.describe_db_snapshots()
 
     def declare_tested_service(self) -> str:
         return 'rds'
@@ -31,11 +53,30 @@ class Tester(interfaces.TesterInterface):
     def declare_tested_provider(self) -> str:
         return 'aws'
 
-    def run_tests(self) -> list:
-        return self.detect_rds_instance_encrypted() + \
-               self.detect_rds_instance_not_publicly_accessible() + \
-               self.detect_rds_instance_not_using_default_port() + \
-               self.detect_rds_snapshot_not_publicly_accessible()
+    def run_tests(self) -> Iterator[List]:
+        # The inventory is streamed a page at a time, only one page of instances or snapshots is held at once.
+        # The DB clusters (Aurora, Multi-AZ) are only inventoried, their instances are checked with the others.
+        self.rds_clusters = []
+        self.inventory_counts = collections.Counter()
+        cluster_paginator = self.aws_rds_client.get_paginator('describe_db_clusters')
+        for page in cluster_paginator.paginate(PaginationConfig={'PageSize': 100}):
+            # The RDS API also returns Neptune and DocumentDB clusters, those have their own testers
+            self.rds_clusters.extend(_compact_db_cluster(cluster) for cluster in page['DBClusters']
+                                     if cluster['Engine'] not in ('neptune', 'docdb'))
+        instance_paginator = self.aws_rds_client.get_paginator('describe_db_instances')
+        for page in instance_paginator.paginate(PaginationConfig={'PageSize': 100}):
+            self.inventory_counts['instances'] += len(page['DBInstances'])
+            yield self.detect_rds_instance_issues(page['DBInstances'])
+        for snapshots in rds_db_snapshot_pages(self.aws_rds_client):
+            self.inventory_counts['snapshots'] += len(snapshots)
+            yield self.detect_rds_snapshot_not_publicly_accessible(
+                [snapshot['DBSnapshotIdentifier'] for snapshot in snapshots])
+
+    def run_summary(self) -> Optional[str]:
+        aurora_clusters = sum(1 for cluster in self.rds_clusters if cluster['engine'].startswith('aurora'))
+        return "Inventoried " + str(self.inventory_counts['instances']) + " DB instances, " + \
+            str(len(self.rds_clusters)) + " DB clusters (" + str(aurora_clusters) + " Aurora) and " + \
+            str(self.inventory_counts['snapshots']) + " DB snapshots"
 
     def _append_rds_test_result(self, rds, test_name, issue_status):
         return {
@@ -49,64 +90,42 @@ class Tester(interfaces.TesterInterface):
             "test_result": issue_status
         }
 
-    def _append_rds_snap_test_result(self, rds, test_name, issue_status):
+    def _append_rds_snap_test_result(self, snapshot_identifier, test_name, issue_status):
         return {
             "user": self.user_id,
             "account_arn": self.account_arn,
             "account": self.account_id,
             "timestamp": time.time(),
-            "item": rds['DBSnapshotIdentifier'],
+            "item": snapshot_identifier,
             "item_type": "rds_snapshot",
             "test_name": test_name,
             "test_result": issue_status
         }
 
-    def _fetch_snapshot_metadata(self, snapshot_identifier):
-        return self.aws_rds_client.describe_db_snapshot_attributes(DBSnapshotIdentifier=snapshot_identifier)
-
-    def detect_rds_instance_encrypted(self):
-        test_name = "encrypted_rds_db_instances"
-        result = []
-        for rds in self.rds_instances['DBInstances']:
-            if not rds['StorageEncrypted']:
-                result.append(self._append_rds_test_result(rds, test_name, "issue_found"))
-            else:
-                result.append(self._append_rds_test_result(rds, test_name, "no_issue_found"))
-        return result
-
-    def detect_rds_instance_not_publicly_accessible(self):
-        test_name = "not_publicly_accessible_rds_db_instances"
+    def detect_rds_instance_issues(self, instances):
+        # All the instance checks are evaluated in a single pass over a page of instances
         result = []
-        for rds in self.rds_instances['DBInstances']:
-            if rds['PubliclyAccessible']:
-                result.append(self._append_rds_test_result(rds, test_name, "issue_found"))
-            else:
-                result.append(self._append_rds_test_result(rds, test_name, "no_issue_found"))
-        return result
-
-    def detect_rds_instance_not_using_default_port(self):
-        test_name = "rds_db_instances_not_using_default_port"
-        result = []
-        for rds in self.rds_instances['DBInstances']:
+        for rds in instances:
+            result.append(self._append_rds_test_result(
+                rds, "encrypted_rds_db_instances", "no_issue_found" if rds['StorageEncrypted'] else "issue_found"))
+            result.append(self._append_rds_test_result(
+                rds, "not_publicly_accessible_rds_db_instances",
+                "issue_found" if rds['PubliclyAccessible'] else "no_issue_found"))
             default_db_engine_port = _return_default_port_on_rds_engines(rds['Engine'])
-            if default_db_engine_port == rds['Endpoint']['Port']:
-                result.append(self._append_rds_test_result(rds, test_name, "issue_found"))
-            else:
-                result.append(self._append_rds_test_result(rds, test_name, "no_issue_found"))
+            # Instances that are still being created have no endpoint yet
+            port = rds.get('Endpoint', {}).get('Port', rds.get('DbInstancePort'))
+            result.append(self._append_rds_test_result(
+                rds, "rds_db_instances_not_using_default_port",
+                "issue_found" if default_db_engine_port == port else "no_issue_found"))
         return result
 
-    def detect_rds_snapshot_not_publicly_accessible(self):
+    def detect_rds_snapshot_not_publicly_accessible(self, snapshot_identifiers):
         test_name = "rds_snapshot_not_publicly_accessible"
         result = []
-        for rds_snap in self.rds_snapshots['DBSnapshots']:
-            issue_found = False
-            snap_metadata = self._fetch_snapshot_metadata(rds_snap['DBSnapshotIdentifier'])
-            for snap_meta in snap_metadata['DBSnapshotAttributesResult']['DBSnapshotAttributes']:
-                if snap_meta['AttributeName'] == 'restore' and 'all' in snap_meta['AttributeValues']:
-                    result.append(self._append_rds_snap_test_result(rds_snap, test_name, "issue_found"))
-                    issue_found = True
-            if not issue_found:
-                result.append(self._append_rds_snap_test_result(rds_snap, test_name, "no_issue_found"))
+        exposure = rds_db_snapshot_exposure(self.aws_rds_client, snapshot_identifiers, self.rds_rate_limiter)
+        for snapshot_identifier, is_public in exposure.items():
+            if is_public:
+                result.append(self._append_rds_snap_test_result(snapshot_identifier, test_name, "issue_found"))
+            else:
+                result.append(self._append_rds_snap_test_result(snapshot_identifier, test_name, "no_issue_found"))
         return result
-
-
@@ -1,6 +1,7 @@
 import time
 import boto3
 import interfaces
+from concurrency import bounded_map
 
 
 def _return_default_port_on_redshift_engines():
@@ -18,7 +19,8 @@ class Tester(interfaces.TesterInterface):
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
-        self.redshift_clusters = self.aws_redshift_client.describe_clusters()
+        self.redshift_clusters = self._return_all_clusters()
+        self.parameter_groups = {}
 
     def declare_tested_service(self) -> str:
         return 'redshift'
@@ -48,6 +50,13 @@ class Tester(interfaces.TesterInterface):
             "test_result": issue_status
         }
 
+    def _return_all_clusters(self):
+        clusters = []
+        paginator = self.aws_redshift_client.get_paginator('describe_clusters')
+        for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+            clusters.extend(page['Clusters'])
+        return clusters
+
     def _return_redshift_logging_status(self, cluster_identifier):
         return self.aws_redshift_client.describe_logging_status(ClusterIdentifier=cluster_identifier)
 
@@ -58,20 +67,27 @@ class Tester(interfaces.TesterInterface):
         return result
 
     def _return_cluster_parameter_data(self, group_name):
-        return self.aws_redshift_client.describe_cluster_parameters(ParameterGroupName=group_name)
+        # Indexed by lower cased parameter name
+        parameters = {}
+        paginator = self.aws_redshift_client.get_paginator('describe_cluster_parameters')
+        for page in paginator.paginate(ParameterGroupName=group_name):
+            for parameter in page['Parameters']:
+                parameters[parameter['ParameterName'].lower()] = parameter.get('ParameterValue')
+        return parameters
+
+    def _resolve_parameter_groups(self, group_names):
+        # Clusters frequently share parameter groups, each group is only described once per run
+        missing_group_names = sorted(set(group_names) - set(self.parameter_groups))
+        self.parameter_groups.update(
+            zip(missing_group_names, bounded_map(self._return_cluster_parameter_data, missing_group_names)))
 
     def _return_ssl_enabled_on_parameter_groups(self, params):
-        ssl_enabled = False
-        for pg in params:
-            if pg['ParameterName'].lower() == 'require_ssl' and pg['ParameterValue'].lower() == 'true':
-                ssl_enabled = True
-                break
-        return ssl_enabled
+        return (params.get('require_ssl') or '').lower() == 'true'
 
     def detect_redshift_cluster_encrypted(self):
         test_name = "encrypted_redshift_cluster"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        for redshift in self.redshift_clusters:
             if not redshift['Encrypted']:
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -81,7 +97,7 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_not_publicly_accessible(self):
         test_name = "not_publicly_accessible_redshift_cluster"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        for redshift in self.redshift_clusters:
             if redshift['PubliclyAccessible']:
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -91,7 +107,7 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_not_using_default_port(self):
         test_name = "redshift_cluster_not_using_default_port"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        for redshift in self.redshift_clusters:
             if _return_default_port_on_redshift_engines() == redshift['Endpoint']['Port']:
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -101,7 +117,7 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_not_using_custom_master_username(self):
         test_name = "redshift_cluster_not_using_custom_master_username"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        for redshift in self.redshift_clusters:
             if _return_default_custom_master_username_on_redshift_engines() == redshift['MasterUsername'].lower():
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -111,8 +127,9 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_using_logging(self):
         test_name = "redshift_cluster_using_logging"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
-            logging_metadata = self._return_redshift_logging_status(redshift['ClusterIdentifier'])
+        logging_statuses = bounded_map(
+            lambda cluster: self._return_redshift_logging_status(cluster['ClusterIdentifier']), self.redshift_clusters)
+        for redshift, logging_metadata in zip(self.redshift_clusters, logging_statuses):
             if not logging_metadata['LoggingEnabled']:
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -122,7 +139,7 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_allow_version_upgrade(self):
         test_name = "redshift_cluster_allow_version_upgrade"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        for redshift in self.redshift_clusters:
             if not redshift['AllowVersionUpgrade']:
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -132,13 +149,14 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_requires_ssl(self):
         test_name = "redshift_cluster_requires_ssl"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        self._resolve_parameter_groups(
+            parameter_group_name for redshift in self.redshift_clusters
+            for parameter_group_name in self._return_parameter_group_names(redshift['ClusterParameterGroups']))
+        for redshift in self.redshift_clusters:
             issue_found = True
             for parameter_group_name in self._return_parameter_group_names(redshift['ClusterParameterGroups']):
-                param_key_value = self._return_cluster_parameter_data(parameter_group_name)
-                if 'Parameters' in param_key_value and len(param_key_value['Parameters']):
-                    if self._return_ssl_enabled_on_parameter_groups(param_key_value['Parameters']):
-                        issue_found = False
+                if self._return_ssl_enabled_on_parameter_groups(self.parameter_groups[parameter_group_name]):
+                    issue_found = False
             if not issue_found:
                 result.append(self._append_redshift_test_result(redshift, test_name, "no_issue_found"))
             else:
@@ -148,7 +166,7 @@ class Tester(interfaces.TesterInterface):
     def detect_redshift_cluster_not_using_ec2_classic(self):
         test_name = "redshift_cluster_not_using_ec2_classic"
         result = []
-        for redshift in self.redshift_clusters['Clusters']:
+        for redshift in self.redshift_clusters:
             if not ('VpcId' in redshift and redshift['VpcId']):
                 result.append(self._append_redshift_test_result(redshift, test_name, "issue_found"))
             else:
@@ -1,16 +1,28 @@
+import os
 import time
+from typing import Optional
 import boto3
-import re
 import ipaddress
 import botocore.exceptions
 import interfaces
+from concurrency import TokenBucket, bounded_map
+
+# Route53 allows 5 requests per second per account, shared with every other caller
+ROUTE53_API_RATE = float(os.environ.get('AUTOPOSTURE_ROUTE53_API_RATE', 4))
+# Zones listed in the run summary, slowest first
+ROUTE53_SUMMARY_SLOWEST_ZONES = 3
 
 
 class Tester(interfaces.TesterInterface):
     def __init__(self):
         self.aws_route53_client = boto3.client('route53')
+        self.route53_rate_limiter = TokenBucket(ROUTE53_API_RATE)
+        # Every Route53 request of this tester, including paginated ones, waits for a token first
+        self.aws_route53_client.meta.events.register(
+            'before-call.route-53', lambda **kwargs: self.route53_rate_limiter.acquire())
         self.aws_ec2_client = boto3.client('ec2')
-        self.hosted_zones = self.aws_route53_client.list_hosted_zones()
+        self.hosted_zones = self._return_all_hosted_zones()
+        self.zone_timings = {}
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
@@ -22,42 +34,75 @@ class Tester(interfaces.TesterInterface):
         return 'aws'
 
     def run_tests(self) -> list:
-        if self.hosted_zones is not None and 'HostedZones' in self.hosted_zones:
-            return self.detect_dangling_dns_records()
-        else:
-            raise Exception("No Route53 data could be retrieved.")
+        return self.detect_dangling_dns_records()
+
+    def run_summary(self) -> Optional[str]:
+        if not self.zone_timings:
+            return None
+        record_count = sum(zone_record_count for zone_record_count, _ in self.zone_timings.values())
+        slowest_zones = sorted(self.zone_timings.items(), key=lambda zone_timing: zone_timing[1][1], reverse=True)
+        return "Scanned " + str(record_count) + " records in " + str(len(self.zone_timings)) + " zones, slowest: " + \
+            ", ".join(zone_id + " (" + str(zone_record_count) + " records, " + "{:.2f}".format(duration) + "s)"
+                      for zone_id, (zone_record_count, duration) in slowest_zones[:ROUTE53_SUMMARY_SLOWEST_ZONES])
+
+    def _return_all_hosted_zones(self):
+        hosted_zones = []
+        paginator = self.aws_route53_client.get_paginator('list_hosted_zones')
+        for page in paginator.paginate():
+            hosted_zones.extend(page['HostedZones'])
+        return hosted_zones
+
+    def _return_elastic_ips_in_region(self, regional_ec2_client):
+        try:
+            addresses = regional_ec2_client.describe_addresses()['Addresses']
+        except botocore.exceptions.ClientError as ex:
+            # Regions disabled by an SCP can't be queried, their addresses are not known
+            print("WARN: Could not list the Elastic IPs of the region " + regional_ec2_client.meta.region_name +
+                  ": " + str(ex))
+            return []
+        return [address['PublicIp'] for address in addresses if 'PublicIp' in address]
+
+    def _return_all_elastic_ips(self):
+        # Clients are created up front, creating them from the worker threads isn't thread safe
+        regional_ec2_clients = [boto3.client('ec2', region_name=region['RegionName'])
+                                for region in self.aws_ec2_client.describe_regions()['Regions']]
+        elastic_ips = set()
+        for region_elastic_ips in bounded_map(self._return_elastic_ips_in_region, regional_ec2_clients):
+            elastic_ips.update(region_elastic_ips)
+        return elastic_ips
+
+    def _return_all_zone_records(self, zone_id):
+        started_at = time.time()
+        records = []
+        paginator = self.aws_route53_client.get_paginator('list_resource_record_sets')
+        for page in paginator.paginate(HostedZoneId=zone_id, PaginationConfig={'PageSize': 300}):
+            records.extend(page['ResourceRecordSets'])
+        self.zone_timings[zone_id] = (len(records), time.time() - started_at)
+        return records
 
     def detect_dangling_dns_records(self):
         result = []
+        elastic_ips = self._return_all_elastic_ips()
         # Filtering the list to get the list of public zones only
-        public_zones = [zone for zone in self.hosted_zones['HostedZones'] if not zone['Config']['PrivateZone']]
-        for cur_zone in public_zones:
-            # Get all records in this zone
-            zone_records = self.aws_route53_client.list_resource_record_sets(
-                HostedZoneId=cur_zone['Id'],
-                StartRecordName='.',
-                StartRecordType='A'
-            )['ResourceRecordSets']
-
-            # Extract record names
-            record_names = [record_name["Name"] for record_name in zone_records]
-
-            # Get public IPs per DNS record
+        public_zones = [zone for zone in self.hosted_zones if not zone['Config']['PrivateZone']]
+        zones_records = bounded_map(lambda zone: self._return_all_zone_records(zone['Id']), public_zones)
+        for cur_zone, zone_records in zip(public_zones, zones_records):
             for record in zone_records:
                 record_name = record["Name"]
                 dangling_ip_addresses = []
-                registered_addresses = [record["ResourceRecords"] for record in zone_records if record["Name"] == record_name][0]
-                registered_ip_addresses = [resource_record["Value"] for resource_record in registered_addresses if re.match('\\d{1,3}\\.\\d{1,3}\\.\\d{1,3}\\.\\d{1,3}', str(resource_record["Value"]))]
-
-                for registered_ip_address in registered_ip_addresses:
-                    if ipaddress.ip_address(registered_ip_address).is_global:
-                        try:
-                            self.aws_ec2_client.describe_addresses(PublicIps=[registered_ip_address])
-                        except botocore.exceptions.ClientError as ex:
-                            if ex.response['Error']['Code'] == 'InvalidAddress.NotFound':
-                                dangling_ip_addresses.append(registered_ip_address)
-                            else:
-                                raise ex
+                # Only A records with values can dangle, the other records (alias records point to AWS resources
+                # rather than IP addresses) are reported without an issue
+                if record['Type'] == 'A':
+                    resource_records = record.get('ResourceRecords', [])
+                else:
+                    resource_records = []
+                for resource_record in resource_records:
+                    try:
+                        registered_ip_address = ipaddress.ip_address(resource_record["Value"])
+                    except ValueError:
+                        continue
+                    if registered_ip_address.is_global and str(registered_ip_address) not in elastic_ips:
+                        dangling_ip_addresses.append(str(registered_ip_address))
 
                 if len(dangling_ip_addresses) > 0:
                     for dangling_ip_address in dangling_ip_addresses:
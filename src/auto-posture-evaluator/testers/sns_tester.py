@@ -2,6 +2,7 @@ import time
 import boto3
 import interfaces
 import json
+from concurrency import bounded_map
 
 
 def _format_string_to_json(text):
@@ -9,13 +10,12 @@ def _format_string_to_json(text):
 
 
 def _check_sns_restriction_enabled(access_policy, is_topic):
-    access_policy = _format_string_to_json(access_policy)
     restricted = True
     if is_topic:
         action_value = "SNS:Publish"
     else:
         action_value = "SNS:Subscribe"
-    for statement in access_policy['Statement']:
+    for statement in access_policy.get('Statement', []) if access_policy else []:
         if 'Effect' in statement and statement['Effect'] == 'Deny':
             continue
         if 'Principal' in statement and 'AWS' in statement['Principal'] and statement['Principal'][
@@ -34,6 +34,7 @@ class Tester(interfaces.TesterInterface):
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
+        self.sns_topics = []
 
     def declare_tested_service(self) -> str:
         return 'sns'
@@ -42,9 +43,10 @@ class Tester(interfaces.TesterInterface):
         return 'aws'
 
     def run_tests(self) -> list:
-        return self.detect_sns_has_restrictions_set_for_publishing() + \
-               self.detect_sns_has_restrictions_set_for_subscription() + \
-               self.detect_sns_topic_has_encryption_enabled()
+        self.sns_topics = self._collect_topic_inventory()
+        return self.detect_sns_has_restrictions_set_for_publishing(self.sns_topics) + \
+               self.detect_sns_has_restrictions_set_for_subscription(self.sns_topics) + \
+               self.detect_sns_topic_has_encryption_enabled(self.sns_topics)
 
     def _append_sns_test_result(self, sns_detail, is_topic, test_name, issue_status):
         return {
@@ -59,16 +61,29 @@ class Tester(interfaces.TesterInterface):
         }
 
     def _return_all_the_topic_arns(self):
-        response = self.aws_sns_client.list_topics()
         topic_arns = []
-        topic_arns.extend(response['Topics'])
-        # The API returns max of 100 topic arns in one call \
-        # and need to paginate it using the next token sent.
-        while len(response['Topics']) >= 100:
-            response = self.aws_sns_client.list_topics(NextToken=response['NextToken'])
-            topic_arns.extend(response['Topics'])
+        # The paginator keeps following NextToken for as long as the API returns one
+        paginator = self.aws_sns_client.get_paginator('list_topics')
+        for page in paginator.paginate():
+            topic_arns.extend(page['Topics'])
         return topic_arns
 
+    def _return_topic_attributes(self, topic):
+        try:
+            response = self.aws_sns_client.get_topic_attributes(TopicArn=topic['TopicArn'])
+        except self.aws_sns_client.exceptions.NotFoundException:
+            # The topic was deleted between the listing and the attributes fetch
+            return None
+        if 'Attributes' not in response or not response['Attributes']:
+            return None
+        attributes = response['Attributes']
+        policy = _format_string_to_json(attributes['Policy']) if attributes.get('Policy') else None
+        return {"attributes": attributes, "policy": policy}
+
+    def _collect_topic_inventory(self):
+        topics = bounded_map(self._return_topic_attributes, self._return_all_the_topic_arns())
+        return [topic for topic in topics if topic is not None]
+
     def _return_all_the_subscription_arns(self):
         response = self.aws_sns_client.list_subscriptions()
         sub_arns = []
@@ -80,48 +95,31 @@ class Tester(interfaces.TesterInterface):
             sub_arns.extend(response['Subscriptions'])
         return sub_arns
 
-    def _restriction_check_on_topics(self, is_topic, test_name):
+    def _restriction_check_on_topics(self, topics, is_topic, test_name):
         result = []
-        topic_arns = self._return_all_the_topic_arns()
-        for topic in topic_arns:
-            response = self.aws_sns_client.get_topic_attributes(
-                TopicArn=topic['TopicArn']
-            )
-            if 'Attributes' in response and response['Attributes']:
-                response = response['Attributes']
-            else:
-                continue
-            if not _check_sns_restriction_enabled(response['Policy'], is_topic):
-                result.append(self._append_sns_test_result(response['DisplayName'], True, test_name, "issue_found"))
+        for topic in topics:
+            display_name = topic["attributes"]['DisplayName']
+            if not _check_sns_restriction_enabled(topic["policy"], is_topic):
+                result.append(self._append_sns_test_result(display_name, True, test_name, "issue_found"))
             else:
-                result.append(self._append_sns_test_result(response['DisplayName'], True, test_name, "no_issue_found"))
+                result.append(self._append_sns_test_result(display_name, True, test_name, "no_issue_found"))
         return result
 
-    def detect_sns_has_restrictions_set_for_publishing(self):
+    def detect_sns_has_restrictions_set_for_publishing(self, topics):
         test_name = "sns_has_restrictions_set_for_publishing"
-        return self._restriction_check_on_topics(True, test_name)
+        return self._restriction_check_on_topics(topics, True, test_name)
 
-    def detect_sns_has_restrictions_set_for_subscription(self):
+    def detect_sns_has_restrictions_set_for_subscription(self, topics):
         test_name = "sns_has_restrictions_set_for_subscription"
-        return self._restriction_check_on_topics(False, test_name)
+        return self._restriction_check_on_topics(topics, False, test_name)
 
-    def detect_sns_topic_has_encryption_enabled(self):
+    def detect_sns_topic_has_encryption_enabled(self, topics):
         test_name = "sns_topic_has_encryption_enabled"
         result = []
-        topic_arns = self._return_all_the_topic_arns()
-        for topic in topic_arns:
-            response = self.aws_sns_client.get_topic_attributes(
-                TopicArn=topic['TopicArn']
-            )
-            if 'Attributes' in response and response['Attributes']:
-                response = response['Attributes']
+        for topic in topics:
+            attributes = topic["attributes"]
+            if not attributes.get('KmsMasterKeyId'):
+                result.append(self._append_sns_test_result(attributes['DisplayName'], True, test_name, "issue_found"))
             else:
-                continue
-            if 'KmsMasterKeyId' in response and not response['KmsMasterKeyId']:
-                result.append(self._append_sns_test_result(response['DisplayName'], True, test_name, "issue_found"))
-            elif 'KmsMasterKeyId' not in response:
-                result.append(self._append_sns_test_result(response['DisplayName'], True, test_name, "issue_found"))
-            else:
-                result.append(self._append_sns_test_result(response['DisplayName'], True, test_name, "no_issue_found"))
+                result.append(self._append_sns_test_result(attributes['DisplayName'], True, test_name, "no_issue_found"))
         return result
-
@@ -2,6 +2,8 @@ import time
 import boto3
 import interfaces
 import json
+from concurrency import bounded_map
+from organization_accounts import get_organization_account_ids, is_external_principal
 
 
 def _format_string_to_json(text):
@@ -15,6 +17,7 @@ class Tester(interfaces.TesterInterface):
         self.user_id = boto3.client('sts').get_caller_identity().get('UserId')
         self.account_arn = boto3.client('sts').get_caller_identity().get('Arn')
         self.account_id = boto3.client('sts').get_caller_identity().get('Account')
+        self.sqs_queues = {}
 
     def declare_tested_service(self) -> str:
         return 'sqs'
@@ -23,10 +26,11 @@ class Tester(interfaces.TesterInterface):
         return 'aws'
 
     def run_tests(self) -> list:
-        return self.detect_sqs_server_side_encryption() + \
-               self.detect_sqs_public_accessible_queues() + \
-               self.detect_sqs_not_encrypted_with_kms_customer_master_keys() + \
-               self.detect_sqs_cross_account_access()
+        self.sqs_queues = self._collect_queue_inventory()
+        return self.detect_sqs_server_side_encryption(self.sqs_queues) + \
+               self.detect_sqs_public_accessible_queues(self.sqs_queues) + \
+               self.detect_sqs_not_encrypted_with_kms_customer_master_keys(self.sqs_queues) + \
+               self.detect_sqs_cross_account_access(self.sqs_queues)
 
     def _append_sqs_test_result(self, sqs_url, test_name, issue_status) -> dict:
         return {
@@ -41,150 +45,110 @@ class Tester(interfaces.TesterInterface):
         }
 
     def _return_all_the_sqs(self):
-        response = self.aws_sqs_client.list_queues(MaxResults=100)
         sqs_urls = []
-        if 'QueueUrls' not in response:
-            return []
-        sqs_urls.extend(response['QueueUrls'])
-        # The API returns max of 100 topic arns in one call \
-        # and need to paginate it using the next token sent.
-        while 'NextToken' in response and response['NextToken']:
-            response = self.aws_sqs_client.list_queues(NextToken=response['NextToken'])
-            sqs_urls.extend(response['QueueUrls'])
+        paginator = self.aws_sqs_client.get_paginator('list_queues')
+        for page in paginator.paginate(PaginationConfig={'PageSize': 1000}):
+            sqs_urls.extend(page.get('QueueUrls', []))
         return sqs_urls
 
-    def _return_all_dead_letter_sqs(self, queue_url):
+    def _return_queue_attributes(self, queue_url):
         try:
-            response = self.aws_sqs_client.client.list_dead_letter_source_queues(QueueUrl=queue_url, MaxResults=100)
-            sqs_dead_letter_urls = []
-            if 'queueUrls' not in response:
-                return []
-            sqs_dead_letter_urls.extend(response['queueUrls'])
-            # The API returns max of 100 topic arns in one call \
-            # and need to paginate it using the next token sent.
-            while 'NextToken' in response and response['NextToken']:
-                response = self.aws_sqs_client.list_queues(NextToken=response['NextToken'])
-                sqs_dead_letter_urls.extend(response['QueueUrls'])
-            return sqs_dead_letter_urls
-        except:
-            return []
-
-    def _find_sse_for_all_queues(self, queue_url, test_name):
+            response = self.aws_sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['All'])
+        except self.aws_sqs_client.exceptions.QueueDoesNotExist:
+            # The queue was deleted between the listing and the attributes fetch
+            return None
+        attributes = response.get('Attributes', {})
+        policy = _format_string_to_json(attributes['Policy']) if attributes.get('Policy') else None
+        return {"attributes": attributes, "policy": policy}
+
+    def _return_dead_letter_queue_url(self, queue_arn):
+        # arn:aws:sqs:<region>:<account>:<queue name>
+        arn_parts = queue_arn.split(':')
+        try:
+            return self.aws_sqs_client.get_queue_url(QueueName=arn_parts[5],
+                                                     QueueOwnerAWSAccountId=arn_parts[4])['QueueUrl']
+        except self.aws_sqs_client.exceptions.QueueDoesNotExist:
+            return None
+
+    def _fetch_queues(self, queue_urls):
+        queues = {}
+        for queue_url, queue in zip(queue_urls, bounded_map(self._return_queue_attributes, queue_urls)):
+            if queue is not None:
+                queues[queue_url] = queue
+        return queues
+
+    def _collect_queue_inventory(self):
+        queues = self._fetch_queues(self._return_all_the_sqs())
+
+        # Dead-letter queues are usually listed as regular queues already, only the ones
+        # referenced by a redrive policy but missing from the listing are fetched separately.
+        known_arns = set(queue["attributes"].get('QueueArn') for queue in queues.values())
+        missing_dl_arns = set()
+        for queue in queues.values():
+            if queue["attributes"].get('RedrivePolicy'):
+                dl_arn = _format_string_to_json(queue["attributes"]['RedrivePolicy']).get('deadLetterTargetArn')
+                if dl_arn and dl_arn not in known_arns:
+                    missing_dl_arns.add(dl_arn)
+        if missing_dl_arns:
+            dl_urls = [url for url in bounded_map(self._return_dead_letter_queue_url, sorted(missing_dl_arns))
+                       if url is not None and url not in queues]
+            queues.update(self._fetch_queues(dl_urls))
+        return queues
+
+    def detect_sqs_server_side_encryption(self, queues) -> list:
         result = []
-        get_queue_attributes_result = self.aws_sqs_client.get_queue_attributes(
-            QueueUrl=queue_url,
-            AttributeNames=['SqsManagedSseEnabled', 'KmsMasterKeyId'])
-        if 'Attributes' in get_queue_attributes_result and ('SqsManagedSseEnabled' in \
-                                                            get_queue_attributes_result['Attributes'] and
-                                                            get_queue_attributes_result['Attributes'][
-                                                                'SqsManagedSseEnabled'] == 'true') or (
-                'KmsMasterKeyId' in get_queue_attributes_result['Attributes'] and
-                get_queue_attributes_result['Attributes'][
-                    'KmsMasterKeyId']):
-            result.append(self._append_sqs_test_result(queue_url, test_name, "no_issue_found"))
-        else:
-            result.append(self._append_sqs_test_result(queue_url, test_name, "issue_found"))
+        test_name = "sqs_has_server_side_encryption"
+        for queue_url, queue in queues.items():
+            attributes = queue["attributes"]
+            if attributes.get('SqsManagedSseEnabled') == 'true' or attributes.get('KmsMasterKeyId'):
+                result.append(self._append_sqs_test_result(queue_url, test_name, "no_issue_found"))
+            else:
+                result.append(self._append_sqs_test_result(queue_url, test_name, "issue_found"))
         return result
 
-    def _get_all_public_accessibility_for_all_queues(self, queue_url, test_name):
+    def detect_sqs_public_accessible_queues(self, queues) -> list:
         result = []
-        get_attribute_result = self.aws_sqs_client.get_queue_attributes(
-            QueueUrl=queue_url,
-            AttributeNames=['Policy'])
-        policy_dict = _format_string_to_json(get_attribute_result['Attributes']['Policy'])
-        restricted = True
-        for policy_statement_dict in policy_dict['Statement']:
-            if policy_statement_dict['Effect'] == 'Allow':
+        test_name = "sqs_public_accessibility"
+        for queue_url, queue in queues.items():
+            restricted = True
+            statements = queue["policy"].get('Statement', []) if queue["policy"] else []
+            for policy_statement_dict in statements:
+                if policy_statement_dict.get('Effect') != 'Allow':
+                    continue
                 if 'Principal' in policy_statement_dict and 'AWS' in policy_statement_dict['Principal'] and \
-                        policy_statement_dict['Principal'][
-                            'AWS'] == '*' and 'Condition' not in policy_statement_dict:
+                        policy_statement_dict['Principal']['AWS'] == '*' and 'Condition' not in policy_statement_dict:
                     restricted = False
                     break
-                if 'Effect' in policy_statement_dict and policy_statement_dict['Effect'] == 'Deny':
-                    continue
-        if restricted:
-            result.append(self._append_sqs_test_result(queue_url, test_name, "no_issue_found"))
-        else:
-            result.append(self._append_sqs_test_result(queue_url, test_name, "issue_found"))
-        return result
-
-    def _get_sse_enabled_and_disabled_queue(self, queue_result_dict) -> list:
-        result = []
-        test_name = "sqs_has_server_side_encryption"
-        for queue_url in queue_result_dict:
-            result.extend(self._find_sse_for_all_queues(queue_url, test_name))
-            for dl_queue_url in self._return_all_dead_letter_sqs(queue_url):
-                result.extend(self._find_sse_for_all_queues(dl_queue_url, test_name))
-        return result
-
-    def _get_policy_for_queues(self, queue_result_dict) -> list:
-        result = []
-        test_name = "sqs_public_accessibility"
-        for queue_url in queue_result_dict:
-            result.extend(self._get_all_public_accessibility_for_all_queues(queue_url, test_name))
-            for dl_queue_url in self._return_all_dead_letter_sqs(queue_url):
-                result.extend(self._get_all_public_accessibility_for_all_queues(dl_queue_url, test_name))
+            if restricted:
+                result.append(self._append_sqs_test_result(queue_url, test_name, "no_issue_found"))
+            else:
+                result.append(self._append_sqs_test_result(queue_url, test_name, "issue_found"))
         return result
 
-    def detect_sqs_server_side_encryption(self) -> list:
-        return self._get_sse_enabled_and_disabled_queue(self._return_all_the_sqs())
-
-    def detect_sqs_public_accessible_queues(self) -> list:
-        return self._get_policy_for_queues(self._return_all_the_sqs())
-
-    def detect_sqs_cross_account_access(self) -> list:
+    def detect_sqs_cross_account_access(self, queues) -> list:
         result = []
         test_name = 'sqs_cross_account_access'
-        client_organizations = boto3.client('organizations')
-        try:
-            resp = client_organizations.list_accounts()
-            all_account_obj = ['Accounts'] in resp and resp['Accounts'] or []
-            all_accounts = []
-            for accounts_dict in all_account_obj:
-                all_accounts.append(accounts_dict)
-            if not all_accounts:
-                all_accounts = [self.account_id]
-        except:
-            all_accounts = [self.account_id]
-
-        for queue_url in self._return_all_the_sqs():
-            response = self.aws_sqs_client.get_queue_attributes(
-                QueueUrl=queue_url,
-                AttributeNames=['Policy'])
+        organization_account_ids = get_organization_account_ids(self.account_id)
+        for queue_url, queue in queues.items():
             issue_found = False
-            if 'Attributes' in response and response['Attributes'] and 'Policy' in response['Attributes']:
-                policy_dict = _format_string_to_json(response['Attributes']['Policy'])
-                if 'Statement' in policy_dict and policy_dict['Statement']:
-                    for statement_dict in policy_dict['Statement']:
-                        if 'Principal' in statement_dict and statement_dict['Principal'] == '*':
-                            issue_found = True
-                        if issue_found:
-                            break
-                        for aws_account_info in statement_dict['Principal']['AWS']:
-                            try:
-                                account_id_to_compare = (re.search(r'\b\d{12}\b', aws_account_info)).group(0)
-                                if account_id_to_compare not in all_accounts:
-                                    issue_found = True
-                                    break
-                            except:
-                                pass
+            statements = queue["policy"].get('Statement', []) if queue["policy"] else []
+            for statement_dict in statements:
+                if statement_dict.get('Effect') == 'Allow' and 'Principal' in statement_dict and \
+                        is_external_principal(statement_dict['Principal'], organization_account_ids):
+                    issue_found = True
+                    break
             if issue_found:
                 result.append(self._append_sqs_test_result(queue_url, test_name, "issue_found"))
             else:
                 result.append(self._append_sqs_test_result(queue_url, test_name, "no_issue_found"))
         return result
 
-    def detect_sqs_not_encrypted_with_kms_customer_master_keys(self):
+    def detect_sqs_not_encrypted_with_kms_customer_master_keys(self, queues):
         result = []
         test_name = 'sqs_not_encrypted_with_kms_customer_master_keys'
-        for queue_url in self._return_all_the_sqs():
-            response = self.aws_sqs_client.get_queue_attributes(
-                QueueUrl=queue_url,
-                AttributeNames=['KmsMasterKeyId'])
-            if 'Attributes' in response and response['Attributes'] and 'KmsMasterKeyId' in response['Attributes'] and \
-                    response['Attributes']['KmsMasterKeyId']:
+        for queue_url, queue in queues.items():
+            if queue["attributes"].get('KmsMasterKeyId'):
                 result.append(self._append_sqs_test_result(queue_url, test_name, "no_issue_found"))
             else:
                 result.append(self._append_sqs_test_result(queue_url, test_name, "issue_found"))
         return result
-
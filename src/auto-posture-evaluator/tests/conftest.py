@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# The evaluator's modules import each other as top level modules (model, testers, disk_cache...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    import disk_cache
+    monkeypatch.setattr(disk_cache, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
@@ -0,0 +1,73 @@
+import os
+
+import boto3
+import pytest
+
+import boto_replay
+import kms_keys
+
+# Recorded with AUTOPOSTURE_BOTO_RECORD from an ebs_tester scan of a moto account: an unencrypted volume
+# attached to an instance with a public snapshot, a volume encrypted with a customer key with a private
+# snapshot, and the instance's root volume
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'ebs_tester.json.gz')
+ATTACHED_VOLUME = "vol-8115a3233de345ace"
+CUSTOMER_KEY_VOLUME = "vol-92b548d1863b46872"
+ROOT_VOLUME = "vol-1dd1b8f4c675151f6"
+
+
+@pytest.fixture
+def replayer(monkeypatch):
+    # The testers create their clients from the default session, a fresh one is replayed
+    monkeypatch.setattr(boto3, 'DEFAULT_SESSION', None)
+    # The recorded snapshots stay recent
+    monkeypatch.setenv('THRESHOLD', '36500')
+    kms_keys.clear_run_cache()
+    yield boto_replay.install(boto_replay.BotoReplayer(FIXTURE))
+    kms_keys.clear_run_cache()
+
+
+def test_ebs_tester_replay(replayer):
+    from testers import ebs_tester
+
+    results = [result for batch in ebs_tester.Tester().run_tests() for result in batch]
+
+    assert sorted((result["test_name"], result["item"]) for result in results
+                  if result["test_result"] == "issue_found") == sorted([
+        ("volume_attached_to_ec2", ATTACHED_VOLUME),
+        ("volume_attached_to_ec2", ROOT_VOLUME),
+        ("volume_does_not_have_recent_snapshots", ROOT_VOLUME),
+        ("volume_is_not_encrypted", ATTACHED_VOLUME),
+        ("volume_is_not_encrypted", ROOT_VOLUME),
+        ("volume_not_encrypted_with_kms_customer_keys", ATTACHED_VOLUME),
+        ("volume_not_encrypted_with_kms_customer_keys", ROOT_VOLUME),
+        ("volume_snapshots_are_public", "snap-92555c3d6d48da9bd"),
+    ])
+    assert len(results) == 14
+    assert all(result["account"] == "123456789012" for result in results)
+    assert replayer.call_counts == {
+        "sts.GetCallerIdentity": 3,
+        "ec2.DescribeVolumes": 1,
+        "ec2.DescribeSnapshots": 1,
+        "kms.ListAliases": 1,
+        "ec2.DescribeSnapshotAttribute": 2,
+    }
+
+
+def test_a_call_missing_from_the_fixture_is_not_sent(replayer):
+    with pytest.raises(boto_replay.ReplayMissError):
+        boto3.client('ec2').describe_instances()
+
+
+def test_the_recorder_writes_only_new_responses(tmp_path):
+    session = boto3.Session()
+    boto_replay.install(boto_replay.BotoReplayer(FIXTURE), session)
+    recorder = boto_replay.install(boto_replay.BotoRecorder(str(tmp_path / 'sts.json.gz')), session)
+    recorder.close()
+    assert not os.path.exists(recorder.path)
+
+    session.client('sts').get_caller_identity()
+    recorder.close()
+    assert boto_replay.BotoReplayer(recorder.path).responses
+    os.remove(recorder.path)
+    recorder.close()
+    assert not os.path.exists(recorder.path)
@@ -0,0 +1,89 @@
+import gzip
+import json
+import time
+
+from delta_reports import DELTA_CHANGED, DELTA_DISAPPEARED, DELTA_NEW, DELTA_STATUS_KEY, DeltaReport, \
+    LocalDigestStore, digest_name
+from result_records import ResultBuilder
+
+records = ResultBuilder("AIDAEXAMPLE", "arn:aws:iam::123456789012:user/auditor", "123456789012")
+
+
+def _result(item, issue_found=False, test_name="volume_is_not_encrypted"):
+    return records.result(item, "ebs_volume", test_name, issue_found=issue_found)
+
+
+def _run(store, results, name="testers.ebs_tester"):
+    delta_report = DeltaReport(store, name)
+    sent = delta_report.filter(results)
+    disappeared = delta_report.disappeared()
+    delta_report.commit()
+    return sent, disappeared
+
+
+def _statuses(results):
+    return [(result["item"], result["test_result"], result.get(DELTA_STATUS_KEY)) for result in results]
+
+
+def test_only_the_new_changed_and_disappeared_results_are_sent(tmp_path):
+    store = LocalDigestStore(str(tmp_path))
+    _run(store, [_result("vol-1"), _result("vol-2"), _result("vol-3", issue_found=True)])
+
+    sent, disappeared = _run(store, [_result("vol-1"), _result("vol-3"), _result("vol-4", issue_found=True)])
+
+    assert _statuses(sent) == [("vol-3", "no_issue_found", DELTA_CHANGED), ("vol-4", "issue_found", DELTA_NEW)]
+    assert _statuses(disappeared) == [("vol-2", "no_issue_found", DELTA_DISAPPEARED)]
+
+
+def test_disappeared_results_keep_the_identity_they_were_tested_as(tmp_path):
+    store = LocalDigestStore(str(tmp_path))
+    _run(store, [_result("vol-1"), _result("vol-2")])
+
+    _, (disappeared,) = _run(store, [_result("vol-1")])
+
+    assert disappeared["user"] == "AIDAEXAMPLE"
+    assert disappeared["account_arn"] == "arn:aws:iam::123456789012:user/auditor"
+    assert disappeared["account"] == "123456789012"
+    assert isinstance(disappeared["timestamp"], float) and len(str(int(disappeared["timestamp"]))) == 10
+
+
+def test_repeated_results_of_an_item_are_tracked_apart(tmp_path):
+    store = LocalDigestStore(str(tmp_path))
+    _run(store, [_result("vol-1"), _result("vol-1", issue_found=True)])
+
+    sent, disappeared = _run(store, [_result("vol-1"), _result("vol-1")])
+    assert _statuses(sent) == [("vol-1", "no_issue_found", DELTA_CHANGED)]
+    assert disappeared == []
+
+    sent, disappeared = _run(store, [_result("vol-1")])
+    assert sent == []
+    assert _statuses(disappeared) == [("vol-1", "no_issue_found", DELTA_DISAPPEARED)]
+
+
+def test_the_digests_of_other_accounts_and_regions_are_kept_apart(tmp_path):
+    store = LocalDigestStore(str(tmp_path))
+    first_account = digest_name("testers.ebs_tester", "123456789012", "us-east-1")
+    other_region = digest_name("testers.ebs_tester", "123456789012", "eu-west-1")
+    other_account = digest_name("testers.ebs_tester", "210987654321", "us-east-1")
+    _run(store, [_result("vol-1")], name=first_account)
+    _run(store, [_result("vol-1")], name=first_account)
+
+    assert len({first_account, other_region, other_account}) == 3
+    for name in (other_region, other_account):
+        sent, disappeared = _run(store, [_result("vol-2")], name=name)
+        assert _statuses(sent) == [("vol-2", "no_issue_found", None)]
+        assert disappeared == []
+    assert _run(store, [_result("vol-1")], name=first_account) == ([], [])
+    assert digest_name("testers.github_tester") == "testers.github_tester"
+
+
+def test_a_digest_in_the_previous_format_gives_a_full_report(tmp_path):
+    store = LocalDigestStore(str(tmp_path))
+    store.save("testers.ebs_tester", gzip.compress(json.dumps({
+        "full_report_at": time.time(),
+        "results": [["volume_is_not_encrypted", "ebs_volume", "vol-1", 0]]}).encode('utf-8')))
+
+    sent, disappeared = _run(store, [_result("vol-1")])
+
+    assert _statuses(sent) == [("vol-1", "no_issue_found", None)]
+    assert disappeared == []
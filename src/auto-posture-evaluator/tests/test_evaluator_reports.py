@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+import auto_posture_evaluator
+from delta_reports import LocalDigestStore
+from model import PostSecurityReportRequest
+from model.wire import SecurityReportEncoder
+
+
+class FakeTester:
+    results = []
+    complete = True
+
+    def declare_tested_provider(self):
+        return 'aws'
+
+    def declare_tested_service(self):
+        return 'fake'
+
+    def run_tests(self):
+        yield from FakeTester.results
+
+    def run_complete(self):
+        return FakeTester.complete
+
+
+def _result(item, test_result="no_issue_found"):
+    return {"timestamp": time.time(), "item": item, "item_type": "fake_item", "test_name": "fake_test",
+            "test_result": test_result}
+
+
+@pytest.fixture
+def evaluator(monkeypatch):
+    FakeTester.complete = True
+    monkeypatch.setenv('API_KEY', 'test')
+    evaluator = auto_posture_evaluator.AutoPostureEvaluator()
+    evaluator.tests = [FakeTester]
+    evaluator.report_encoder = SecurityReportEncoder()
+    evaluator.report_chunk_size = 2
+    evaluator.reports = []
+
+    async def post(channel, api_key, payload):
+        evaluator.reports.append(PostSecurityReportRequest().parse(payload).security_report)
+
+    monkeypatch.setattr(auto_posture_evaluator, 'post_encoded_security_report', post)
+    yield evaluator
+    evaluator.channel.close()
+
+
+def _parts(reports):
+    # (item, report_sequence, report_final) of the results of every report, bools are sent as numbers
+    parts = []
+    for report in reports:
+        fields = [result.additional_data.fields for result in report.test_results]
+        parts.append([(result.item,
+                       field["report_sequence"].number_value if "report_sequence" in field else None,
+                       field["report_final"].number_value if "report_final" in field else None)
+                      for result, field in zip(report.test_results, fields)])
+    return parts
+
+
+def test_split_reports_are_numbered_and_the_last_one_is_final(evaluator):
+    FakeTester.results = [_result("a"), _result("b"), _result("c"), _result("d"), _result("e")]
+    evaluator.run_tests()
+
+    assert len({report.context.execution_id for report in evaluator.reports}) == 1
+    assert _parts(evaluator.reports) == [
+        [("a", 1, None), ("b", 1, None)],
+        [("c", 2, None), ("d", 2, None)],
+        [("e", 3, True)]]
+
+
+def test_a_full_last_chunk_is_final(evaluator):
+    FakeTester.results = [_result("a"), _result("b"), _result("c"), _result("d")]
+    evaluator.run_tests()
+
+    assert _parts(evaluator.reports) == [
+        [("a", 1, None), ("b", 1, None)],
+        [("c", 2, True), ("d", 2, True)]]
+
+
+def test_a_single_report_is_not_marked(evaluator):
+    FakeTester.results = [[_result("a"), _result("b")]]
+    evaluator.run_tests()
+
+    assert _parts(evaluator.reports) == [[("a", None, None), ("b", None, None)]]
+
+
+def test_the_disappeared_results_are_the_final_report(evaluator, tmp_path):
+    evaluator.delta_store = LocalDigestStore(str(tmp_path))
+    FakeTester.results = [_result("a"), _result("b")]
+    evaluator.run_tests()
+    evaluator.reports = []
+
+    FakeTester.results = [_result("a", "issue_found"), _result("c")]
+    evaluator.report_chunk_size = 1
+    evaluator.run_tests()
+
+    assert _parts(evaluator.reports) == [
+        [("a", 1, None)],
+        [("c", 2, None)],
+        [("b", 3, True)]]
+
+
+def test_a_partial_run_leaves_the_digest_unchanged(evaluator, tmp_path):
+    evaluator.delta_store = LocalDigestStore(str(tmp_path))
+    FakeTester.results = [_result("a"), _result("b", "issue_found")]
+    evaluator.run_tests()
+    digest_paths = list(tmp_path.iterdir())
+    digests = [path.read_bytes() for path in digest_paths]
+    evaluator.reports = []
+
+    # b wasn't scanned this time, it is neither reported as disappeared nor dropped from the digest
+    FakeTester.results = [_result("a", "issue_found")]
+    FakeTester.complete = False
+    evaluator.run_tests()
+
+    assert _parts(evaluator.reports) == [[("a", None, None)]]
+    assert [path.read_bytes() for path in digest_paths] == digests
+    assert list(tmp_path.iterdir()) == digest_paths
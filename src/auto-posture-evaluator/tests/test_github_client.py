@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+import github_client
+from github_client import GitHubClient, GitHubRateLimitExhausted
+from testers import github_tester
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from github_server import GitHubStandIn, serve  # noqa: E402
+
+MEMBERS = ['user%d' % i for i in range(250)]
+ORGANIZATIONS = {
+    'org1': {"members": MEMBERS, "2fa_disabled": MEMBERS[:2], "admins": MEMBERS[:3],
+             "repos": [{"name": "repo1", "allow_forking": True}]},
+    'org2': {"members": MEMBERS[:5], "2fa_disabled": [], "admins": MEMBERS[:1],
+             "repos": [{"name": "repo2", "allow_forking": False}]},
+}
+
+
+@pytest.fixture
+def github(monkeypatch, cache_directory):
+    servers = []
+
+    def start(**stand_in_options):
+        stand_in = GitHubStandIn(ORGANIZATIONS, **stand_in_options)
+        server = serve(stand_in)
+        servers.append(server)
+        monkeypatch.setattr(github_client, 'GITHUB_API_URL', 'http://127.0.0.1:' + str(server.server_address[1]))
+        return stand_in
+
+    monkeypatch.setattr(github_client, 'GITHUB_RATE_LIMIT_RESERVE', 0)
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+async def _get_members(client, times=1):
+    for _ in range(times):
+        members = await client.get_all('/orgs/org1/members', fields=("login",))
+    return members
+
+
+def _run(coroutine_function, *args):
+    async def with_client():
+        async with GitHubClient('token') as client:
+            return await coroutine_function(client, *args)
+    return asyncio.run(with_client())
+
+
+def test_pages_are_followed_and_revalidated_with_etags(github):
+    stand_in = github()
+    members = _run(_get_members, 2)
+
+    assert [member["login"] for member in members] == MEMBERS
+    assert [status for _, _, status in stand_in.requests] == [200, 200, 200, 304, 304, 304]
+    # Not modified responses don't count against the budget
+    assert stand_in.remaining == stand_in.rate_limit - 3
+
+
+def test_requests_are_paced_once_the_budget_runs_low(github, monkeypatch):
+    monkeypatch.setattr(github_client, 'GITHUB_PACING_THRESHOLD', 1000)
+    monkeypatch.setattr(github_client, 'GITHUB_MAX_PACING_DELAY', 0.2)
+    stand_in = github(rate_limit=500)
+    _run(_get_members)
+
+    request_times = [request_time for request_time, _, _ in stand_in.requests]
+    assert len(request_times) == 3
+    # The first response reports the low budget, the following requests are spread out
+    assert min(later - earlier for earlier, later in zip(request_times[1:], request_times[2:])) >= 0.18
+
+
+def test_budget_exhaustion_stops_the_requests(github):
+    stand_in = github(rate_limit=2)
+    with pytest.raises(GitHubRateLimitExhausted):
+        _run(_get_members)
+    # The third page is never requested, the remaining budget is known to be used up
+    assert len(stand_in.requests) == 2
+
+
+def test_retry_after_is_honoured(github):
+    stand_in = github(retry_after_every=2, retry_after=1)
+    members = _run(_get_members)
+
+    assert len(members) == len(MEMBERS)
+    statuses = [status for _, _, status in stand_in.requests]
+    assert statuses[:3] == [200, 403, 200]
+    assert stand_in.requests[2][0] - stand_in.requests[1][0] >= 1
+
+
+def test_scans_deferred_by_the_rate_limit_resume_on_the_next_run(github, monkeypatch):
+    monkeypatch.setenv('AUTOPOSTURE_GITHUB_ORGANIZATIONS', 'org1,org2')
+    monkeypatch.setenv('AUTOPOSTURE_GITHUB_TOKEN', 'token')
+    # The admin checks (priority 0) of both organizations fit in the budget, the rest is deferred
+    github(rate_limit=2)
+    first_results = github_tester.Tester().run_tests()
+    assert sorted(result["test_name"] for result in first_results) == ["too_many_admin_users_per_org"] * 2
+
+    stand_in = github()
+    second_results = github_tester.Tester().run_tests()
+    paths = [path for _, path, _ in stand_in.requests]
+    # The deferred scans run first
+    assert not any('role=admin' in path for path in paths[:4])
+    assert {result["test_name"] for result in second_results} == {
+        "too_many_admin_users_per_org", "users_without_mfa", "forking_enabled_repos"}
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from github_client import GitHubRateLimitExhausted
+from testers import github_tester
+
+
+class FakeGitHubClient:
+    instances = []
+    # Path suffix whose request exhausts the rate limit budget
+    exhausted_on = None
+
+    def __init__(self, token):
+        self.closed = False
+        self.exhausted = False
+        FakeGitHubClient.instances.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.closed = True
+
+    async def get_all(self, path, fields=None):
+        assert not self.closed
+        if FakeGitHubClient.exhausted_on is not None and path.endswith(FakeGitHubClient.exhausted_on):
+            self.exhausted = True
+            raise GitHubRateLimitExhausted()
+        if path.endswith('filter=2fa_disabled'):
+            return [{"login": "bob"}]
+        if path.endswith('/repos'):
+            return [{"name": "repo", "allow_forking": True}]
+        return [{"login": "alice"}, {"login": "bob"}]
+
+
+@pytest.fixture
+def tester(monkeypatch, cache_directory):
+    FakeGitHubClient.instances = []
+    FakeGitHubClient.exhausted_on = None
+    monkeypatch.setattr(github_tester, 'GitHubClient', FakeGitHubClient)
+    monkeypatch.setenv('AUTOPOSTURE_GITHUB_ORGANIZATIONS', 'org')
+    return github_tester.Tester()
+
+
+def _issues(results):
+    return sorted((result["test_name"], result["item"]) for result in results if result["test_result"] == "issue_found")
+
+
+def test_every_run_uses_its_own_client(tester):
+    first_results = tester.run_tests()
+    second_results = tester.run_tests()
+
+    assert len(FakeGitHubClient.instances) == 2
+    assert all(client.closed for client in FakeGitHubClient.instances)
+    assert _issues(first_results) == _issues(second_results) == [
+        ("forking_enabled_repos", "repo"), ("users_without_mfa", "bob@@org")]
+
+
+def test_a_run_with_deferred_scans_is_partial(tester):
+    FakeGitHubClient.exhausted_on = '/repos'
+    partial_results = tester.run_tests()
+
+    assert not tester.run_complete()
+    assert tester.deferred_scans == [("forking_enabled_repos", "org")]
+    assert _issues(partial_results) == [("users_without_mfa", "bob@@org")]
+
+    FakeGitHubClient.exhausted_on = None
+    tester.run_tests()
+    assert tester.run_complete()
+
+
+def test_run_keeps_the_evaluators_event_loop_usable(tester, monkeypatch):
+    # asyncio.run() clears the current event loop, the evaluator's channel must keep its own
+    monkeypatch.setenv('API_KEY', 'test')
+    import auto_posture_evaluator
+    evaluator = auto_posture_evaluator.AutoPostureEvaluator()
+    tester.run_tests()
+    assert evaluator.channel._loop is evaluator.loop
+    assert evaluator.loop.run_until_complete(asyncio.sleep(0, result="sent")) == "sent"
+    evaluator.channel.close()
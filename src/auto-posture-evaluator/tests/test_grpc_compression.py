@@ -0,0 +1,60 @@
+import asyncio
+import os
+import socket
+import sys
+from datetime import datetime
+
+from grpclib.client import Channel
+from grpclib.server import Server
+
+import auto_posture_evaluator
+from grpc_compression import GZIP_COMPRESSION_SUPPORTED, post_compressed_security_report
+from model import SecurityReportContext
+from model.wire import SecurityReportEncoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from ingestion_server import StandInIngestionService  # noqa: E402
+from synthetic_results import synthetic_results  # noqa: E402
+
+CONTEXT = SecurityReportContext(provider="aws", service="ebs", execution_id="e1d1b7b0", application_name="app",
+                                computer_name="CoralogixServerlessLambda", subsystem_name="sub")
+START_TIME = datetime(2026, 10, 19, 12, 30, 15, 250000)
+END_TIME = datetime(2026, 10, 19, 12, 31, 0)
+
+
+def test_the_installed_grpclib_is_supported():
+    assert GZIP_COMPRESSION_SUPPORTED
+
+
+def test_post_compressed_security_report():
+    service = StandInIngestionService(decode=True)
+    payload = SecurityReportEncoder().encode(CONTEXT, synthetic_results(1000), START_TIME, END_TIME)
+
+    with socket.socket() as free_port:
+        free_port.bind(('127.0.0.1', 0))
+        port = free_port.getsockname()[1]
+
+    async def post():
+        server = Server([service])
+        await server.start('127.0.0.1', port)
+        channel = Channel('127.0.0.1', port)
+        try:
+            return await post_compressed_security_report(channel, api_key="key", payload=payload)
+        finally:
+            channel.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(post())
+    assert service.stats.reports == 1
+    assert service.stats.results == 1000
+    assert service.stats.wire_bytes < len(payload) / 10
+
+
+def test_unsupported_grpclib_sends_uncompressed(monkeypatch):
+    monkeypatch.setenv('API_KEY', 'test')
+    monkeypatch.setenv('AUTOPOSTURE_GZIP_COMPRESSION', 'true')
+    monkeypatch.setattr(auto_posture_evaluator, 'GZIP_COMPRESSION_SUPPORTED', False)
+    evaluator = auto_posture_evaluator.AutoPostureEvaluator()
+    evaluator.channel.close()
+    assert not evaluator.gzip_compression
@@ -0,0 +1,57 @@
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import kms_keys
+
+
+@pytest.fixture(autouse=True)
+def clear_run_cache():
+    kms_keys.clear_run_cache()
+
+
+def _stub_snapshot(stubber, key_id, key_state):
+    stubber.add_response('list_keys', {'Keys': [{'KeyId': key_id}]}, {'Limit': 1000})
+    stubber.add_response('describe_key', {'KeyMetadata': {'KeyId': key_id, 'KeyManager': 'CUSTOMER',
+                                                          'KeyState': key_state}}, {'KeyId': key_id})
+    stubber.add_response('get_key_rotation_status', {'KeyRotationEnabled': True}, {'KeyId': key_id})
+
+
+def test_snapshot_is_kept_per_account_for_the_run():
+    kms_client = boto3.client('kms', region_name='us-east-1')
+    with Stubber(kms_client) as stubber:
+        _stub_snapshot(stubber, 'key-a', 'Enabled')
+        _stub_snapshot(stubber, 'key-b', 'Enabled')
+        _stub_snapshot(stubber, 'key-a', 'PendingDeletion')
+
+        assert list(kms_keys.get_kms_key_snapshot(kms_client, '111111111111')) == ['key-a']
+        assert list(kms_keys.get_kms_key_snapshot(kms_client, '111111111111')) == ['key-a']
+        # Another account (the role changed) never sees the first account's keys
+        assert list(kms_keys.get_kms_key_snapshot(kms_client, '222222222222')) == ['key-b']
+
+        # The next run describes the keys again
+        kms_keys.clear_run_cache()
+        snapshot = kms_keys.get_kms_key_snapshot(kms_client, '111111111111')
+        assert snapshot['key-a']['metadata']['KeyState'] == 'PendingDeletion'
+        stubber.assert_no_pending_responses()
+
+
+def test_aliases_are_kept_per_account_for_the_run():
+    kms_client = boto3.client('kms', region_name='us-east-1')
+    with Stubber(kms_client) as stubber:
+        for account_id in ('111111111111', '222222222222', '111111111111'):
+            stubber.add_response('list_aliases', {'Aliases': [{
+                'AliasName': 'alias/aws/ebs',
+                'AliasArn': 'arn:aws:kms:us-east-1:' + account_id + ':alias/aws/ebs',
+                'TargetKeyId': 'key-' + account_id
+            }]}, {'Limit': 100})
+
+        aliases = kms_keys.get_kms_key_aliases(kms_client, '111111111111')
+        assert aliases['arn:aws:kms:us-east-1:111111111111:key/key-111111111111'] == ['alias/aws/ebs']
+        assert aliases['key-111111111111'] == ['alias/aws/ebs']
+        assert kms_keys.get_kms_key_aliases(kms_client, '111111111111') is aliases
+        assert 'key-111111111111' not in kms_keys.get_kms_key_aliases(kms_client, '222222222222')
+
+        kms_keys.clear_run_cache()
+        assert kms_keys.get_kms_key_aliases(kms_client, '111111111111') is not aliases
+        stubber.assert_no_pending_responses()
@@ -0,0 +1,40 @@
+import botocore.exceptions
+import pytest
+
+import organization_accounts
+
+
+@pytest.fixture(autouse=True)
+def clear_memo(cache_directory, monkeypatch):
+    monkeypatch.setattr(organization_accounts, '_resolved_account_ids', {})
+
+
+def _access_denied(*args, **kwargs):
+    raise botocore.exceptions.ClientError({'Error': {'Code': 'AccessDeniedException'}}, 'ListAccounts')
+
+
+def test_resolved_accounts_are_memoized_until_the_ttl(monkeypatch):
+    calls = []
+    monkeypatch.setattr(organization_accounts, '_list_organization_account_ids',
+                        lambda: calls.append(1) or ['111111111111', '222222222222'])
+    now = [1000.0]
+    monkeypatch.setattr(organization_accounts.time, 'time', lambda: now[0])
+    monkeypatch.setattr(organization_accounts.disk_cache, 'load', lambda name, ttl: None)
+
+    expected = frozenset(['111111111111', '222222222222', '333333333333'])
+    assert organization_accounts.get_organization_account_ids('333333333333') == expected
+    assert organization_accounts.get_organization_account_ids('333333333333') == expected
+    assert len(calls) == 1
+
+    now[0] += organization_accounts.ORGANIZATION_ACCOUNTS_TTL
+    organization_accounts.get_organization_account_ids('333333333333')
+    assert len(calls) == 2
+
+
+def test_failed_lookup_is_not_cached(monkeypatch):
+    monkeypatch.setattr(organization_accounts, '_list_organization_account_ids', _access_denied)
+    assert organization_accounts.get_organization_account_ids('333333333333') == frozenset(['333333333333'])
+
+    monkeypatch.setattr(organization_accounts, '_list_organization_account_ids', lambda: ['111111111111'])
+    assert organization_accounts.get_organization_account_ids('333333333333') == \
+        frozenset(['111111111111', '333333333333'])
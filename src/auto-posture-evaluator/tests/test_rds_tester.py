@@ -0,0 +1,49 @@
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from testers import rds_tester
+
+
+def _instance(identifier, engine='postgres', port=5432):
+    return {'DBInstanceIdentifier': identifier, 'Engine': engine, 'StorageEncrypted': True,
+            'PubliclyAccessible': False, 'Endpoint': {'Port': port}}
+
+
+@pytest.fixture
+def rds_client(monkeypatch):
+    rds_client = boto3.client('rds', region_name='us-east-1')
+    sts_client = boto3.client('sts', region_name='us-east-1')
+    sts_stubber = Stubber(sts_client)
+    for _ in range(3):
+        sts_stubber.add_response('get_caller_identity', {'UserId': 'AIDAEXAMPLE', 'Account': '111111111111',
+                                                         'Arn': 'arn:aws:iam::111111111111:user/auditor'})
+    sts_stubber.activate()
+    clients = {'rds': rds_client, 'sts': sts_client}
+    monkeypatch.setattr(rds_tester.boto3, 'client', lambda service_name: clients[service_name])
+    return rds_client
+
+
+def test_clusters_are_inventoried_by_page(rds_client):
+    with Stubber(rds_client) as stubber:
+        stubber.add_response('describe_db_clusters', {'DBClusters': [
+            {'DBClusterIdentifier': 'aurora-1', 'Engine': 'aurora-postgresql'},
+            {'DBClusterIdentifier': 'graph', 'Engine': 'neptune'}], 'Marker': 'page-2'},
+            {'MaxRecords': 100})
+        stubber.add_response('describe_db_clusters', {'DBClusters': [
+            {'DBClusterIdentifier': 'multi-az', 'Engine': 'mysql'}]},
+            {'MaxRecords': 100, 'Marker': 'page-2'})
+        stubber.add_response('describe_db_instances', {'DBInstances': [
+            _instance('aurora-1-instance-1', 'aurora-postgresql'), _instance('db-1', port=5433)]},
+            {'MaxRecords': 100})
+        stubber.add_response('describe_db_snapshots', {'DBSnapshots': []}, {'MaxRecords': 100})
+
+        tester = rds_tester.Tester()
+        results = [result for batch in tester.run_tests() for result in batch]
+
+    assert [cluster['identifier'] for cluster in tester.rds_clusters] == ['aurora-1', 'multi-az']
+    assert len(results) == 6
+    assert [(result['item'], result['test_result']) for result in results
+            if result['test_name'] == 'rds_db_instances_not_using_default_port'] == [
+        ('aurora-1-instance-1', 'issue_found'), ('db-1', 'no_issue_found')]
+    assert tester.run_summary() == "Inventoried 2 DB instances, 2 DB clusters (1 Aurora) and 0 DB snapshots"
@@ -0,0 +1,148 @@
+import time
+
+import pytest
+
+import auto_posture_evaluator
+from auto_posture_evaluator import RESOURCE_TESTS_KEY, RESOURCE_TESTS_NAME, _aggregate_by_resource
+from delta_reports import LocalDigestStore
+from model import PostSecurityReportRequest, SecurityReportTestResultResult
+from model.wire import SecurityReportEncoder
+
+
+def _s3_result(bucket, test_name, issue_found, timestamp, **evidence):
+    result = {"user": "user", "account_arn": "arn:aws:iam::123456789012:user/user", "account": "123456789012",
+              "timestamp": timestamp, "item": bucket, "item_type": "s3_bucket", "test_name": test_name,
+              "test_result": "issue_found" if issue_found else "no_issue_found"}
+    result.update(evidence)
+    return result
+
+
+def _s3_results():
+    return [
+        _s3_result("logs", "bucket_without_encryption", False, 1700000000.5, algorithm="aws:kms"),
+        _s3_result("logs", "bucket_without_versioning", True, 1700000001.5, versioning="Suspended"),
+        _s3_result("site", "bucket_without_encryption", False, 1700000002.5, algorithm="AES256"),
+        _s3_result("logs", "bucket_is_public", False, 1700000003.5),
+    ]
+
+
+def test_every_test_keeps_its_result_timestamp_and_evidence():
+    aggregated_results = _aggregate_by_resource(_s3_results())
+
+    assert aggregated_results == [{
+        "user": "user", "account_arn": "arn:aws:iam::123456789012:user/user", "account": "123456789012",
+        "item": "logs", "item_type": "s3_bucket", "timestamp": 1700000000.5, "test_name": RESOURCE_TESTS_NAME,
+        "test_result": "issue_found",
+        RESOURCE_TESTS_KEY: [
+            {"timestamp": 1700000000.5, "test_name": "bucket_without_encryption", "test_result": "no_issue_found",
+             "algorithm": "aws:kms"},
+            {"timestamp": 1700000001.5, "test_name": "bucket_without_versioning", "test_result": "issue_found",
+             "versioning": "Suspended"},
+            {"timestamp": 1700000003.5, "test_name": "bucket_is_public", "test_result": "no_issue_found"},
+        ]
+    }, {
+        "user": "user", "account_arn": "arn:aws:iam::123456789012:user/user", "account": "123456789012",
+        "item": "site", "item_type": "s3_bucket", "algorithm": "AES256", "timestamp": 1700000002.5,
+        "test_name": RESOURCE_TESTS_NAME, "test_result": "no_issue_found",
+        RESOURCE_TESTS_KEY: [
+            {"timestamp": 1700000002.5, "test_name": "bucket_without_encryption", "test_result": "no_issue_found"},
+        ]
+    }]
+
+
+def test_a_value_differing_between_tests_stays_with_each_test():
+    results = [_s3_result("logs", "first", False, 1700000000.5, region="us-east-1"),
+               _s3_result("logs", "second", False, 1700000000.5, region="eu-west-1")]
+
+    aggregated_result, = _aggregate_by_resource(results)
+
+    assert "region" not in aggregated_result
+    assert [test["region"] for test in aggregated_result[RESOURCE_TESTS_KEY]] == ["us-east-1", "eu-west-1"]
+
+
+class FakeTester:
+    results = None
+
+    def declare_tested_provider(self):
+        return 'aws'
+
+    def declare_tested_service(self):
+        return 's3'
+
+    def run_tests(self):
+        results = FakeTester.results() if FakeTester.results else _s3_results()
+        for result in results:
+            result["timestamp"] = time.time()
+        return results
+
+
+@pytest.fixture
+def evaluator(monkeypatch):
+    monkeypatch.setenv('API_KEY', 'test')
+    evaluator = auto_posture_evaluator.AutoPostureEvaluator()
+    FakeTester.results = None
+    evaluator.tests = [FakeTester]
+    evaluator.aggregate_by_resource = True
+    evaluator.gzip_compression = True
+    evaluator.payloads = []
+
+    async def post(channel, api_key, payload):
+        evaluator.payloads.append(payload)
+
+    monkeypatch.setattr(auto_posture_evaluator, 'GZIP_COMPRESSION_THRESHOLD', 0)
+    monkeypatch.setattr(auto_posture_evaluator, 'post_compressed_security_report', post)
+    yield evaluator
+    evaluator.channel.close()
+
+
+@pytest.mark.parametrize('direct_encoding', [False, True])
+def test_aggregated_results_are_sent_compressed_as_test_results(evaluator, direct_encoding):
+    if direct_encoding:
+        evaluator.report_encoder = SecurityReportEncoder()
+    evaluator.run_tests()
+
+    payload, = evaluator.payloads
+    test_results = PostSecurityReportRequest().parse(payload).security_report.test_results
+    assert [(result.name, result.item, result.result) for result in test_results] == [
+        (RESOURCE_TESTS_NAME, "logs", SecurityReportTestResultResult.TEST_FAILED),
+        (RESOURCE_TESTS_NAME, "site", SecurityReportTestResultResult.TEST_PASSED)]
+    tests = test_results[0].additional_data.fields[RESOURCE_TESTS_KEY].list_value.values
+    assert [(test.struct_value.fields["test_name"].string_value,
+             test.struct_value.fields["timestamp"].number_value > 0) for test in tests] == [
+        ("bucket_without_encryption", True), ("bucket_without_versioning", True), ("bucket_is_public", True)]
+    assert tests[0].struct_value.fields["algorithm"].string_value == "aws:kms"
+    assert tests[1].struct_value.fields["versioning"].string_value == "Suspended"
+
+
+def test_the_delta_filter_compares_whole_resources(evaluator, tmp_path):
+    evaluator.delta_store = LocalDigestStore(str(tmp_path))
+
+    def bucket_results(versioning_issue):
+        return lambda: [_s3_result("logs", "bucket_without_encryption", True, 1700000000.5),
+                        _s3_result("logs", "bucket_without_versioning", versioning_issue, 1700000000.5)]
+
+    def sent_resources():
+        resources = []
+        for payload in evaluator.payloads:
+            for result in PostSecurityReportRequest().parse(payload).security_report.test_results:
+                fields = result.additional_data.fields
+                resources.append((result.item, result.result,
+                                  fields["delta_status"].string_value if "delta_status" in fields else None,
+                                  sorted(test.struct_value.fields["test_name"].string_value
+                                         for test in fields[RESOURCE_TESTS_KEY].list_value.values)))
+        evaluator.payloads = []
+        return resources
+
+    FakeTester.results = bucket_results(versioning_issue=True)
+    evaluator.run_tests()
+    assert sent_resources() == [("logs", SecurityReportTestResultResult.TEST_FAILED, None,
+                                 ["bucket_without_encryption", "bucket_without_versioning"])]
+
+    # The versioning is fixed, the bucket still fails its encryption test
+    FakeTester.results = bucket_results(versioning_issue=False)
+    evaluator.run_tests()
+    assert sent_resources() == [("logs", SecurityReportTestResultResult.TEST_FAILED, "changed",
+                                 ["bucket_without_encryption", "bucket_without_versioning"])]
+
+    evaluator.run_tests()
+    assert sent_resources() == []
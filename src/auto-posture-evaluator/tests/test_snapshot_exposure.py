@@ -0,0 +1,83 @@
+import threading
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+import snapshot_exposure
+from concurrency import TokenBucket
+
+
+def _answer_by_snapshot_id(client, event_name, responses):
+    # Answers the calls by snapshot id from any worker thread, unlike botocore's Stubber which expects
+    # the calls in order
+    def before_call(params, **kwargs):
+        # EC2 and RDS are query APIs, the serialized parameters are the request body
+        snapshot_id = params['body'].get('SnapshotId') or params['body'].get('DBSnapshotIdentifier')
+        status_code, parsed = responses[snapshot_id]
+        return AWSResponse(None, status_code, {}, None), parsed
+
+    client.meta.events.register(event_name, before_call)
+
+
+def test_scan_keeps_the_order_and_skips_missing_snapshots():
+    snapshot_ids = ['snap-%d' % i for i in range(50)]
+    threads = set()
+
+    def is_public(snapshot_id):
+        threads.add(threading.get_ident())
+        index = int(snapshot_id.split('-')[1])
+        return None if index % 10 == 0 else index % 2 == 1
+
+    exposure = snapshot_exposure.scan_snapshot_exposure(snapshot_ids, is_public, TokenBucket(1000000), max_workers=4)
+
+    assert list(exposure) == [snapshot_id for snapshot_id in snapshot_ids if not snapshot_id.endswith('0')]
+    assert exposure['snap-3'] is True and exposure['snap-4'] is False
+    assert len(threads) > 1
+
+
+def test_scan_is_rate_limited(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(TokenBucket, 'acquire', lambda self: sleeps.append(self.rate))
+    snapshot_exposure.scan_snapshot_exposure(['snap-1', 'snap-2'], lambda snapshot_id: False, TokenBucket(5))
+    assert sleeps == [5, 5]
+
+
+def test_the_scans_of_a_run_share_the_rate_limit():
+    # A burst of two calls, the scan of each page takes from the same bucket instead of starting with a full one
+    rate_limiter = TokenBucket(rate=0.001, capacity=2)
+    for page in (['snap-1'], ['snap-2']):
+        snapshot_exposure.scan_snapshot_exposure(page, lambda snapshot_id: False, rate_limiter)
+    assert rate_limiter._tokens < 1
+
+
+def test_ebs_snapshot_exposure():
+    ec2_client = boto3.client('ec2', region_name='us-east-1')
+    _answer_by_snapshot_id(ec2_client, 'before-call.ec2.DescribeSnapshotAttribute', {
+        'snap-public': (200, {'CreateVolumePermissions': [{'Group': 'all'}]}),
+        'snap-shared': (200, {'CreateVolumePermissions': [{'UserId': '111111111111'}]}),
+        'snap-private': (200, {'CreateVolumePermissions': []}),
+        'snap-deleted': (400, {'Error': {'Code': 'InvalidSnapshot.NotFound', 'Message': ''}}),
+    })
+
+    exposure = snapshot_exposure.ebs_snapshot_exposure(
+        ec2_client, ['snap-public', 'snap-shared', 'snap-deleted', 'snap-private'], TokenBucket(1000000))
+
+    assert exposure == {'snap-public': True, 'snap-shared': False, 'snap-private': False}
+
+
+def test_rds_db_snapshot_exposure():
+    rds_client = boto3.client('rds', region_name='us-east-1')
+
+    def attributes(values):
+        return 200, {'DBSnapshotAttributesResult': {'DBSnapshotAttributes': [
+            {'AttributeName': 'restore', 'AttributeValues': values}]}}
+
+    _answer_by_snapshot_id(rds_client, 'before-call.rds.DescribeDBSnapshotAttributes', {
+        'public': attributes(['all']),
+        'shared': attributes(['111111111111']),
+        'deleted': (404, {'Error': {'Code': 'DBSnapshotNotFound', 'Message': ''}}),
+    })
+
+    exposure = snapshot_exposure.rds_db_snapshot_exposure(rds_client, ['public', 'shared', 'deleted'], TokenBucket(1000000))
+
+    assert exposure == {'public': True, 'shared': False}
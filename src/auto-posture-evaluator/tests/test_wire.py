@@ -0,0 +1,170 @@
+import asyncio
+import os
+import socket
+import sys
+from datetime import datetime
+
+import pytest
+from grpclib.client import Channel
+from grpclib.server import Server
+
+from auto_posture_evaluator import _to_models
+from model import PostSecurityReportRequest, SecurityReport, SecurityReportContext, SecurityReportTestResult, \
+    SecurityReportTestResultResult
+from model.helper import struct_from_dict
+from model.wire import SecurityReportEncoder, post_encoded_security_report
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from ingestion_server import StandInIngestionService  # noqa: E402
+
+START_TIME = datetime(2026, 10, 19, 12, 30, 15, 250000)
+END_TIME = datetime(2026, 10, 19, 12, 31, 0)
+CONTEXT = SecurityReportContext(provider="aws", service="ebs", execution_id="e1d1b7b0", application_name="app",
+                                computer_name="CoralogixServerlessLambda", subsystem_name="sub")
+
+
+def _result(item, test_name="volume_is_not_encrypted", test_result="issue_found", **additional_data):
+    result = {
+        "user": "AIDAEXAMPLE",
+        "account_arn": "arn:aws:iam::111111111111:user/example",
+        "account": "111111111111",
+        "timestamp": 1792412415.5,
+        "item": item,
+        "item_type": "ebs_volume",
+        "test_name": test_name,
+        "test_result": test_result
+    }
+    result.update(additional_data)
+    return result
+
+
+def _betterproto_bytes(context, results, start_time=START_TIME, end_time=END_TIME):
+    report = SecurityReport(context=context, test_results=_to_models(results, start_time, end_time))
+    return bytes(PostSecurityReportRequest(security_report=report))
+
+
+def _assert_round_trip(context, results, encoder=None, start_time=START_TIME, end_time=END_TIME):
+    encoded = (encoder or SecurityReportEncoder()).encode(context, results, start_time, end_time)
+    assert encoded == _betterproto_bytes(context, results, start_time, end_time)
+    parsed = PostSecurityReportRequest().parse(encoded).security_report
+    assert len(parsed.test_results) == len(results)
+    for test_result, result in zip(parsed.test_results, results):
+        assert test_result.name == result["test_name"]
+        assert test_result.item == result["item"]
+        assert test_result.item_type == result["item_type"]
+    return parsed
+
+
+def test_matches_an_explicitly_built_report():
+    result = _result("vol-1", policy={"Statement": [{"Effect": "Allow", "Principal": "*"}]}, ports=[22, 3389])
+    expected = bytes(PostSecurityReportRequest(security_report=SecurityReport(context=CONTEXT, test_results=[
+        SecurityReportTestResult(
+            name="volume_is_not_encrypted",
+            start_time=START_TIME,
+            end_time=END_TIME,
+            item="vol-1",
+            item_type="ebs_volume",
+            result=SecurityReportTestResultResult.TEST_FAILED,
+            additional_data=struct_from_dict({
+                "user": "AIDAEXAMPLE",
+                "account_arn": "arn:aws:iam::111111111111:user/example",
+                "account": "111111111111",
+                "timestamp": 1792412415.5,
+                "policy": {"Statement": [{"Effect": "Allow", "Principal": "*"}]},
+                "ports": [22, 3389]
+            }))
+    ])))
+    assert SecurityReportEncoder().encode(CONTEXT, [result], START_TIME, END_TIME) == expected
+
+
+def test_empty_report():
+    _assert_round_trip(CONTEXT, [])
+    _assert_round_trip(SecurityReportContext(), [])
+
+
+def test_unicode():
+    parsed = _assert_round_trip(CONTEXT, [
+        _result("vol-ü日本", test_name="tést", note="café \U0001f512", **{"clé": "é"})
+    ])
+    assert parsed.test_results[0].additional_data.fields["note"].string_value == "café \U0001f512"
+
+
+def test_missing_optional_fields():
+    # Unset context fields, no additional data at all, and falsy additional data which is never sent
+    _assert_round_trip(SecurityReportContext(provider="aws"), [
+        {"timestamp": 1792412415.5, "item": "vol-1", "item_type": "ebs_volume", "test_name": "t",
+         "test_result": "no_issue_found"},
+        _result("", test_name="", empty="", zero=0, none=None, empty_list=[], empty_dict={}),
+        _result("vol-2", item_type=""),
+    ])
+
+
+def test_values_and_timestamps():
+    _assert_round_trip(CONTEXT, [
+        _result("vol-1", test_result="no_issue_found", negative=-1, huge=2 ** 70, fraction=0.1, flag=True,
+                when=datetime(2020, 1, 1), nested={"a": {"b": [1, "two", None, {"c": 3}]}}, empty_key_dict={"": 1},
+                non_string_keys={1: "one"}, unsupported=object.__new__(object), empty_string_list=[""]),
+    ])
+    _assert_round_trip(CONTEXT, [_result("vol-1")], start_time=datetime.fromtimestamp(0),
+                       end_time=datetime(2026, 1, 1))
+
+
+def test_fragment_cache_eviction():
+    # A cache smaller than the distinct fragments of the report only keeps the first ones, the bytes don't change
+    results = [_result("vol-%d" % i, test_name="test_%d" % (i % 7), zone="zone-%d" % i, shared="same")
+               for i in range(60)]
+    expected = _betterproto_bytes(CONTEXT, results)
+    expected_reversed = _betterproto_bytes(CONTEXT, results[::-1])
+    for cache_size in (0, 1, 5, 50, 4096):
+        encoder = SecurityReportEncoder(fragment_cache_size=cache_size)
+        assert encoder.encode(CONTEXT, results, START_TIME, END_TIME) == expected
+        assert len(encoder._fragments) <= cache_size
+        # The encoder and its bounded cache are reused for the next report
+        assert encoder.encode(CONTEXT, results[::-1], START_TIME, END_TIME) == expected_reversed
+
+
+def test_fragment_cache_hits_match_misses():
+    encoder = SecurityReportEncoder()
+    uncached_encoder = SecurityReportEncoder(fragment_cache_size=0)
+    time_range = b"\x22\x02\x08\x01"
+    result = _result("vol-1", zone="eu-west-1a")
+    # Encoding the same result twice: the first time misses (and fills) the cache, the second one hits it
+    first = encoder.encode_test_result(result, time_range)
+    assert ("zone", "eu-west-1a") in encoder._fragments
+    second = encoder.encode_test_result(dict(result), time_range)
+    assert first == second == uncached_encoder.encode_test_result(result, time_range)
+    assert not uncached_encoder._fragments
+
+    results = [_result("vol-%d" % i, test_name="test_%d" % (i % 3), zone="zone-%d" % (i % 2)) for i in range(30)]
+    assert encoder.encode(CONTEXT, results, START_TIME, END_TIME) == \
+        uncached_encoder.encode(CONTEXT, results, START_TIME, END_TIME)
+
+
+def test_post_encoded_security_report():
+    service = StandInIngestionService(decode=True)
+    results = [_result("vol-%d" % i) for i in range(10)]
+    payload = SecurityReportEncoder().encode(CONTEXT, results, START_TIME, END_TIME)
+
+    with socket.socket() as free_port:
+        free_port.bind(('127.0.0.1', 0))
+        port = free_port.getsockname()[1]
+
+    async def post():
+        server = Server([service])
+        await server.start('127.0.0.1', port)
+        channel = Channel('127.0.0.1', port)
+        try:
+            return await post_encoded_security_report(channel, api_key="key", payload=payload)
+        finally:
+            channel.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(post())
+    assert service.stats.reports == 1
+    assert service.stats.results == 10
+
+
+@pytest.mark.parametrize("count", [1, 300])
+def test_large_reports(count):
+    _assert_round_trip(CONTEXT, [_result("vol-%d" % i, index=i) for i in range(count)])